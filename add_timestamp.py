@@ -1,56 +1,233 @@
+import queue
+import subprocess
+import threading
+
 import cv2
 import numpy as np
 
-def add_timestamp_to_video(input_path, output_path):
+try:
+    import av  # PyAV: optional, faster threaded decode than VideoCapture
+except ImportError:
+    av = None
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 1.2
+TEXT_COLOR = (255, 255, 255)
+THICKNESS = 2
+
+
+def _render_timestamp_tile(timestamp_text, width):
+    # Rasterize the boxed timestamp once into a small tile plus its frame ROI
+    text_size = cv2.getTextSize(timestamp_text, FONT, FONT_SCALE, THICKNESS)[0]
+    text_x = width - text_size[0] - 20
+    text_y = 40
+    
+    x0, y0 = text_x - 10, text_y - text_size[1] - 10
+    x1, y1 = text_x + text_size[0] + 11, text_y + 11
+    
+    tile = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+    cv2.putText(tile, timestamp_text, (text_x - x0, text_y - y0), FONT, FONT_SCALE, TEXT_COLOR, THICKNESS)
+    
+    # The box pokes above the frame at this font size; clip it like cv2.rectangle would
+    cy, cx = max(-y0, 0), max(-x0, 0)
+    return tile[cy:, cx:], (y0 + cy, y1, x0 + cx, x1)
+
+
+def _open_writer(output_path, fps, width, height):
+    # Prefer hardware H.264 (NVENC/VAAPI/QSV/VideoToolbox, whichever FFmpeg has)
+    out = cv2.VideoWriter(
+        output_path, cv2.CAP_FFMPEG, cv2.VideoWriter_fourcc(*'avc1'), fps, (width, height),
+        [cv2.VIDEOWRITER_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+    )
+    if out.isOpened():
+        return out
+    
+    # Fall back to the software MPEG-4 encoder
+    fourcc = cv2.VideoWriter_fourcc(*'XVID')
+    return cv2.VideoWriter(output_path, fourcc, fps, (width, height), isColor=True)
+
+
+def _read_frames(cap, read_q, stop, errors):
+    # Decode on a background thread; None marks end of stream, sent even if
+    # decoding fails (the exception goes to errors for the main thread)
+    try:
+        while not stop.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            read_q.put(frame)
+    except Exception as e:
+        errors.append(e)
+    finally:
+        read_q.put(None)
+
+
+def _probe_av(input_path):
+    # (fps, width, height) as PyAV will decode the stream, or None if it can't.
+    # PyAV ignores rotation metadata that VideoCapture applies, so the decoded
+    # frame size is checked rather than trusting the stream header
+    try:
+        with av.open(input_path) as container:
+            stream = container.streams.video[0]
+            frame = next(container.decode(stream), None)
+            if frame is None:
+                return None
+            height, width = frame.to_ndarray(format='bgr24').shape[:2]
+            fps = float(stream.average_rate or stream.guessed_rate or 0)
+    except Exception:
+        return None
+    return fps, width, height
+
+
+def _read_frames_av(input_path, read_q, stop, errors):
+    # PyAV decode with FFmpeg frame threading; each frame is a fresh ndarray
+    # because it stays in flight through the write queue after annotation
+    try:
+        with av.open(input_path) as container:
+            stream = container.streams.video[0]
+            stream.thread_type = "AUTO"
+            for frame in container.decode(stream):
+                if stop.is_set():
+                    break
+                read_q.put(frame.to_ndarray(format='bgr24'))
+    except Exception as e:
+        errors.append(e)
+    finally:
+        read_q.put(None)
+
+
+def _write_frames(out, write_q, errors):
+    # Encode on a background thread until the None sentinel arrives; after a
+    # failure keep draining the queue so the main thread never blocks on put
+    while True:
+        frame = write_q.get()
+        if frame is None:
+            break
+        if errors:
+            continue
+        try:
+            out.write(frame)
+        except Exception as e:
+            errors.append(e)
+
+
+def add_timestamp_to_video(input_path, output_path, prefetch=16):
     cap = cv2.VideoCapture(input_path)
     
     fps = cap.get(cv2.CAP_PROP_FPS)
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    # Container-reported count; only used for progress, so 0 (unknown) is fine
+    n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     
-    # Use lossless codec for maximum quality
-    fourcc = cv2.VideoWriter_fourcc(*'XVID')
-    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height), isColor=True)
+    # Decode with PyAV only when its frames match the size VideoCapture reports
+    # (a rotated recording comes out transposed, and VideoWriter silently drops
+    # frames of the wrong size); its own frame rate is used when it decodes
+    use_av = False
+    if av is not None:
+        probe = _probe_av(input_path)
+        if probe is not None and probe[1:] == (width, height):
+            use_av = True
+            if probe[0] > 0:
+                fps = probe[0]
+    
+    out = _open_writer(output_path, fps, width, height)
+    
+    # decode -> annotate -> encode pipeline; annotation stays on this thread
+    read_q = queue.Queue(maxsize=prefetch)
+    write_q = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    errors = []  # exceptions raised on the worker threads, re-raised below
+    if use_av:
+        # VideoCapture was only needed for the stream properties
+        cap.release()
+        reader = threading.Thread(target=_read_frames_av, args=(input_path, read_q, stop, errors), daemon=True)
+    else:
+        reader = threading.Thread(target=_read_frames, args=(cap, read_q, stop, errors), daemon=True)
+    writer = threading.Thread(target=_write_frames, args=(out, write_q, errors), daemon=True)
+    reader.start()
+    writer.start()
     
     frame_count = 0
+    sec = 0
+    next_second_frame = fps
+    cached_tile, (y0, y1, x0, x1) = _render_timestamp_tile("00:00", width)
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    try:
+        while True:
+            frame = read_q.get()
+            if frame is None or errors:
+                break
             
-        current_time_seconds = frame_count / fps
-        minutes = int(current_time_seconds // 60)
-        seconds = int(current_time_seconds % 60)
-        
-        timestamp_text = f"{minutes:02d}:{seconds:02d}"
-        
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 1.2
-        color = (255, 255, 255)
-        thickness = 2
-        
-        text_size = cv2.getTextSize(timestamp_text, font, font_scale, thickness)[0]
-        text_x = width - text_size[0] - 20
-        text_y = 40
-        
-        cv2.rectangle(frame, (text_x - 10, text_y - text_size[1] - 10), 
-                     (text_x + text_size[0] + 10, text_y + 10), (0, 0, 0), -1)
-        
-        cv2.putText(frame, timestamp_text, (text_x, text_y), font, font_scale, color, thickness)
-        
-        out.write(frame)
-        frame_count += 1
+            # The text only changes once per second, so the clock advances and the
+            # tile is re-rendered only when a second boundary is crossed
+            if frame_count >= next_second_frame:
+                sec = int(frame_count / fps)
+                next_second_frame = (sec + 1) * fps
+                timestamp_text = f"{sec // 60:02d}:{sec % 60:02d}"
+                cached_tile, (y0, y1, x0, x1) = _render_timestamp_tile(timestamp_text, width)
+            
+            frame[y0:y1, x0:x1] = cached_tile
+            
+            write_q.put(frame)
+            frame_count += 1
+            
+            if frame_count & 255 == 0:
+                if n_frames > 0:
+                    print(f"Processed {frame_count}/{n_frames} frames ({frame_count * 100 // n_frames}%, {sec}s)")
+                else:
+                    print(f"Processed {frame_count} frames ({sec}s)")
+    
+    finally:
+        stop.set()
+        write_q.put(None)
+        # the reader may be blocked on a full queue if we stopped early
+        while reader.is_alive():
+            try:
+                read_q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        reader.join()
+        writer.join()
         
-        if frame_count % 100 == 0:
-            print(f"Processed {frame_count} frames ({current_time_seconds:.1f}s)")
+        cap.release()
+        out.release()
     
-    cap.release()
-    out.release()
+    if errors:
+        raise errors[0]
     print(f"Video with timestamp saved to: {output_path}")
 
+def add_timestamp_with_ffmpeg(input_path, output_path, video_codec="libx264", preset=None, fontfile=None):
+    # Same overlay via FFmpeg's drawtext filter, so decode, annotate and encode
+    # all stay inside one libav pipeline. Pass e.g. video_codec="h264_nvenc",
+    # preset="p1" to encode on the GPU; presets are encoder specific, so none is
+    # passed unless given. FFmpeg builds without fontconfig need a fontfile.
+    # The colon inside the strftime format is escaped once for the option
+    # parser and once more for drawtext's own argument splitting.
+    drawtext = (
+        r"drawtext=text='%{pts\:gmtime\:0\:%M\\\:%S}'"
+        ":x=w-tw-20:y=40-th:fontsize=36:fontcolor=white"
+        ":box=1:boxcolor=black:boxborderw=10"
+    )
+    if fontfile:
+        escaped = str(fontfile).replace("\\", "\\\\").replace(":", "\\:")
+        drawtext += f":fontfile='{escaped}'"
+    ffmpeg_cmd = [
+        "ffmpeg", "-y",
+        "-i", input_path,
+        "-vf", drawtext,
+        "-c:v", video_codec,
+    ]
+    if preset:
+        ffmpeg_cmd += ["-preset", preset]
+    ffmpeg_cmd += ["-c:a", "copy", output_path]
+    
+    subprocess.run(ffmpeg_cmd, check=True)
+    print(f"Video with timestamp saved to: {output_path}")
+
+
 if __name__ == "__main__":
     input_video = "videos/output_long_again_2.mp4"
     output_video = "videos/output_long_again_2_timestamped.mp4"
     
-    add_timestamp_to_video(input_video, output_video)
\ No newline at end of file
+    add_timestamp_to_video(input_video, output_video)
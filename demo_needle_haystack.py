@@ -10,106 +10,136 @@ from video_understanding.needle_haystack_processor import (
     generate_hud_data
 )
 import json
+import re
+import sys
+from types import MappingProxyType
+from typing import List
+
+
+def _frozen(*events):
+    """Read-only event records, shared by every call instead of rebuilt"""
+    return tuple(MappingProxyType(event) for event in events)
+
+
+# Mock responses are built once at import. Callers only read them; anything
+# that needs to mutate a record should copy it first.
+_PIPETTE_VOLUME_EVENTS = _frozen(
+    {'timestamp': '00:01:15', 'new_volume': '30µL', 'confidence': 0.95},
+    {'timestamp': '00:03:42', 'new_volume': '20µL', 'confidence': 0.92},
+    {'timestamp': '00:07:18', 'new_volume': '30µL', 'confidence': 0.98}
+)
+
+_ASPIRATION_EVENTS = _frozen(
+    {
+        'timestamp': '00:01:30', 
+        'container': 'eppendorf_tube_A', 
+        'reagent': 'Reagent A',
+        'volume': '30µL',
+        'label': 'A'
+    },
+    {
+        'timestamp': '00:04:15',
+        'container': 'eppendorf_tube_B',
+        'reagent': 'Reagent B', 
+        'volume': '20µL',
+        'label': 'B'
+    },
+    {
+        'timestamp': '00:07:45',
+        'container': 'eppendorf_tube_A',
+        'reagent': 'Reagent A',
+        'volume': '30µL', 
+        'label': 'A'
+    }
+)
+
+_DISPENSING_EVENTS = _frozen(
+    {
+        'timestamp': '00:01:50',
+        'well_id': 'A1',
+        'volume': '30µL',
+        'mixing': False
+    },
+    {
+        'timestamp': '00:04:35', 
+        'well_id': 'A2',
+        'volume': '20µL',
+        'mixing': False
+    },
+    {
+        'timestamp': '00:08:10',
+        'well_id': 'A1',  # Same well - potential contamination!
+        'volume': '30µL',
+        'mixing': True
+    }
+)
+
+_TIP_CHANGE_EVENTS = _frozen(
+    {
+        'timestamp': '00:00:30',
+        'action': 'pickup',
+        'new_tip': True
+    },
+    {
+        'timestamp': '00:06:00',
+        'action': 'eject', 
+        'new_tip': False
+    },
+    {
+        'timestamp': '00:06:15',
+        'action': 'pickup',
+        'new_tip': True  
+    }
+)
+
+_PROTOCOL_CONTEXT = MappingProxyType({
+    'reagents': _frozen(
+        {'name': 'Reagent A', 'container': 'eppendorf_tube_A', 'volume': 500.0},
+        {'name': 'Reagent B', 'container': 'eppendorf_tube_B', 'volume': 500.0}
+    ),
+    'target_wells': ('A1', 'A2', 'B1', 'B2'),
+    'protocol_name': 'Standard Mixing Assay'
+})
+
+_MOCK_RESPONSES = MappingProxyType({
+    'pipette_volume': _PIPETTE_VOLUME_EVENTS,
+    'aspirate': _ASPIRATION_EVENTS,
+    'dispense': _DISPENSING_EVENTS,
+    'tip_change': _TIP_CHANGE_EVENTS,
+    'protocol': _PROTOCOL_CONTEXT
+})
 
 
 class MockNeedleHaystackProcessor(NeedleHaystackProcessor):
     """Mock processor that simulates realistic lab video events"""
     
-    def _query_video_model(self, query: str) -> list:
+    # One alternation per query type; match.lastgroup names the response
+    _QUERY_RE = re.compile(
+        r'(?P<pipette_volume>pipette volume setting)'
+        r'|(?P<aspirate>aspirated from containers)'
+        r'|(?P<dispense>dispensed from pipette into wells)'
+        r'|(?P<tip_change>tips are changed)'
+        r'|(?P<protocol>experimental protocol)'
+    )
+    
+    def _query_video_model(self, query: str):
         """Return realistic mock events based on query type"""
         
-        if "pipette volume setting" in query:
-            return [
-                {'timestamp': '00:01:15', 'new_volume': '30µL', 'confidence': 0.95},
-                {'timestamp': '00:03:42', 'new_volume': '20µL', 'confidence': 0.92},
-                {'timestamp': '00:07:18', 'new_volume': '30µL', 'confidence': 0.98}
-            ]
-            
-        elif "aspirated from containers" in query:
-            return [
-                {
-                    'timestamp': '00:01:30', 
-                    'container': 'eppendorf_tube_A', 
-                    'reagent': 'Reagent A',
-                    'volume': '30µL',
-                    'label': 'A'
-                },
-                {
-                    'timestamp': '00:04:15',
-                    'container': 'eppendorf_tube_B',
-                    'reagent': 'Reagent B', 
-                    'volume': '20µL',
-                    'label': 'B'
-                },
-                {
-                    'timestamp': '00:07:45',
-                    'container': 'eppendorf_tube_A',
-                    'reagent': 'Reagent A',
-                    'volume': '30µL', 
-                    'label': 'A'
-                }
-            ]
-            
-        elif "dispensed from pipette into wells" in query:
-            return [
-                {
-                    'timestamp': '00:01:50',
-                    'well_id': 'A1',
-                    'volume': '30µL',
-                    'mixing': False
-                },
-                {
-                    'timestamp': '00:04:35', 
-                    'well_id': 'A2',
-                    'volume': '20µL',
-                    'mixing': False
-                },
-                {
-                    'timestamp': '00:08:10',
-                    'well_id': 'A1',  # Same well - potential contamination!
-                    'volume': '30µL',
-                    'mixing': True
-                }
-            ]
-            
-        elif "tips are changed" in query:
-            return [
-                {
-                    'timestamp': '00:00:30',
-                    'action': 'pickup',
-                    'new_tip': True
-                },
-                {
-                    'timestamp': '00:06:00',
-                    'action': 'eject', 
-                    'new_tip': False
-                },
-                {
-                    'timestamp': '00:06:15',
-                    'action': 'pickup',
-                    'new_tip': True  
-                }
-            ]
-            
-        elif "experimental protocol" in query:
-            return {
-                'reagents': [
-                    {'name': 'Reagent A', 'container': 'eppendorf_tube_A', 'volume': 500.0},
-                    {'name': 'Reagent B', 'container': 'eppendorf_tube_B', 'volume': 500.0}
-                ],
-                'target_wells': ['A1', 'A2', 'B1', 'B2'],
-                'protocol_name': 'Standard Mixing Assay'
-            }
-            
-        return []
+        match = self._QUERY_RE.search(query)
+        if match is None:
+            return ()
+        return _MOCK_RESPONSES[match.lastgroup]
 
 
 def run_demo():
     """Run a complete demonstration of the needle-in-haystack processor"""
     
-    print("🎬 NEEDLE-IN-HAYSTACK VIDEO PROCESSOR DEMO")
-    print("=" * 50)
-    print()
+    # Collect output and write it once at the end instead of per-line prints
+    lines: List[str] = []
+    
+    lines.append("🎬 NEEDLE-IN-HAYSTACK VIDEO PROCESSOR DEMO")
+    lines.append("=" * 50)
+    lines.append("")
     
     # Initialize processor with mock data
     video_frames = []  # Would contain actual video frames
@@ -117,67 +147,70 @@ def run_demo():
     
     processor = MockNeedleHaystackProcessor(video_frames, video_duration)
     
-    print("📹 Processing entire video with targeted queries...")
+    lines.append("📹 Processing entire video with targeted queries...")
     experiment_state = processor.process_video()
     
-    print(f"✅ Processing complete! Experiment ID: {experiment_state.experiment_id}")
-    print()
+    lines.append(f"✅ Processing complete! Experiment ID: {experiment_state.experiment_id}")
+    lines.append("")
     
     # Show extracted events
-    print("🎯 EXTRACTED EVENTS:")
-    print("-" * 20)
+    lines.append("🎯 EXTRACTED EVENTS:")
+    lines.append("-" * 20)
     for i, event in enumerate(processor.events, 1):
-        print(f"{i:2d}. [{event.timestamp}] {event.event_type.upper()}")
+        lines.append(f"{i:2d}. [{event.timestamp}] {event.event_type.upper()}")
         for key, value in event.data.items():
-            print(f"    {key}: {value}")
-        print()
+            lines.append(f"    {key}: {value}")
+        lines.append("")
     
     # Show final experiment state
-    print("🧪 FINAL EXPERIMENT STATE:")
-    print("-" * 25)
-    print(f"Pipette volume setting: {experiment_state.pipette_state.volume_setting_ul}µL")
-    print(f"Last reagent: {experiment_state.pipette_state.last_reagent_aspirated.name if experiment_state.pipette_state.last_reagent_aspirated else 'None'}")
-    print(f"Tip contamination: {experiment_state.pipette_state.tip_contamination_level.value}")
-    print(f"Wells with reagents: {len(experiment_state.wells)}")
-    print(f"Total transfers: {len(experiment_state.all_transfers)}")
-    print(f"Contamination warnings: {len(experiment_state.contamination_warnings)}")
-    print()
+    lines.append("🧪 FINAL EXPERIMENT STATE:")
+    lines.append("-" * 25)
+    lines.append(f"Pipette volume setting: {experiment_state.pipette_state.volume_setting_ul}µL")
+    lines.append(f"Last reagent: {experiment_state.pipette_state.last_reagent_aspirated.name if experiment_state.pipette_state.last_reagent_aspirated else 'None'}")
+    lines.append(f"Tip contamination: {experiment_state.pipette_state.tip_contamination_level.value}")
+    lines.append(f"Wells with reagents: {len(experiment_state.wells)}")
+    lines.append(f"Total transfers: {len(experiment_state.all_transfers)}")
+    lines.append(f"Contamination warnings: {len(experiment_state.contamination_warnings)}")
+    lines.append("")
     
     # Show well contents
     if experiment_state.wells:
-        print("🧬 WELL CONTENTS:")
-        print("-" * 15)
+        lines.append("🧬 WELL CONTENTS:")
+        lines.append("-" * 15)
         for well_id, well in experiment_state.wells.items():
-            print(f"{well_id}: {well.total_volume_ul}µL total")
+            lines.append(f"{well_id}: {well.total_volume_ul}µL total")
             for reagent in well.reagents:
-                print(f"  • {reagent.name}: {reagent.volume_ul}µL")
-        print()
+                lines.append(f"  • {reagent.name}: {reagent.volume_ul}µL")
+        lines.append("")
     
     # Show warnings
     if experiment_state.contamination_warnings:
-        print("⚠️  CONTAMINATION WARNINGS:")
-        print("-" * 25)
+        lines.append("⚠️  CONTAMINATION WARNINGS:")
+        lines.append("-" * 25)
         for warning in experiment_state.contamination_warnings:
-            print(f"• {warning.severity.value.upper()}: {warning.description}")
-            print(f"  Affected wells: {', '.join(warning.affected_containers)}")
-            print(f"  Risk level: {warning.contamination_probability:.1%}")
-            print()
+            lines.append(f"• {warning.severity.value.upper()}: {warning.description}")
+            lines.append(f"  Affected wells: {', '.join(warning.affected_containers)}")
+            lines.append(f"  Risk level: {warning.contamination_probability:.1%}")
+            lines.append("")
     
     # Generate HUD data
-    print("📊 HUD OVERLAY DATA:")
-    print("-" * 18)
+    lines.append("📊 HUD OVERLAY DATA:")
+    lines.append("-" * 18)
     hud_data = generate_hud_data(experiment_state)
-    print(json.dumps(hud_data, indent=2))
-    print()
+    lines.append(json.dumps(hud_data, indent=2))
+    lines.append("")
+    
+    lines.append("🎉 DEMO COMPLETE!")
+    lines.append("=" * 50)
+    lines.append("Key advantages over batch-by-batch processing:")
+    lines.append("• No error propagation (no more eppendorf hallucinations!)")
+    lines.append("• Complete video context for each query")
+    lines.append("• Accurate state reconstruction via event replay") 
+    lines.append("• Real-time HUD data for live demos")
+    lines.append("• Scalable to any video length")
     
-    print("🎉 DEMO COMPLETE!")
-    print("=" * 50)
-    print("Key advantages over batch-by-batch processing:")
-    print("• No error propagation (no more eppendorf hallucinations!)")
-    print("• Complete video context for each query")
-    print("• Accurate state reconstruction via event replay") 
-    print("• Real-time HUD data for live demos")
-    print("• Scalable to any video length")
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 
 if __name__ == "__main__":
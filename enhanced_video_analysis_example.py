@@ -7,24 +7,83 @@ with your existing video analysis workflow to create a comprehensive
 lab monitoring system.
 """
 
-import uuid
+import itertools
+import re
+import sys
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set, Tuple
 
 from video_understanding.models import (
-    VideoAnalysis, ExperimentState, PipetteState, PipetteAction,
+    EXPERIMENT_REGISTRY, VideoAnalysis, ExperimentState, PipetteState, PipetteAction,
     ContaminationLevel, Reagent, ReagentTransfer, ContaminationWarning,
     VolumeDiscrepancy, WellContents, WarningType, WarningSeverity,
     TipContaminationHistory
 )
 
 
+# Protocol-log patterns, compiled once at import
+_VOLUME_RE = re.compile(r'(\d+)(?:\.\d+)?\s*[µu]?l', re.IGNORECASE)
+_VOLUME_SET_KEYWORDS = frozenset(["volume", "set"])
+_REAGENT_A_KEYWORDS = frozenset(["reagent a", "orange"])
+
+# Every keyword the thinking-text extractor looks for. The zero-width lookahead
+# reports a hit at every position (overlaps included), so one finditer pass
+# yields the same answers as a separate `in` check per keyword.
+_WELL_INDICATORS = ("a1", "a2", "a3", "b1", "b2", "b3")
+_CONTAMINATION_KEYWORDS = ("contamination", "cross", "dirty", "residue")
+_THINKING_KEYWORDS = (
+    "pipette", "volume", "30", "aspirat", "orange", "reagent a", "dispens",
+    "tip", "change", "attach",
+) + _WELL_INDICATORS + _CONTAMINATION_KEYWORDS
+_THINKING_SCAN_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, _THINKING_KEYWORDS)) + "))"
+)
+
+
+
+def _classify_thinking(thinking_lower: str) -> Tuple[Set[str], List[str], Optional[str]]:
+    """Classify lowercased thinking text by keyword.
+    
+    Returns the keyword hits, the key events they imply and the dispensed-into
+    well (if any). Pure string work with no model or state access, so it can be
+    compiled ahead of time with mypyc.
+    """
+    hits: Set[str] = {match.group(1) for match in _THINKING_SCAN_RE.finditer(thinking_lower)}
+    key_events: List[str] = []
+    dispensed_well: Optional[str] = None
+    
+    if "pipette" in hits and "volume" in hits:
+        key_events.append("pipette_volume_change")
+    
+    if "aspirat" in hits:
+        key_events.append("aspiration_detected")
+    
+    if "dispens" in hits:
+        key_events.append("dispensing_detected")
+        for well in _WELL_INDICATORS:
+            if well in hits:
+                dispensed_well = well.upper()
+                break
+    
+    if "tip" in hits and ("change" in hits or "attach" in hits):
+        key_events.append("tip_change_detected")
+    
+    return hits, key_events, dispensed_well
+
+
 class EnhancedVideoAnalyzer:
     """Enhanced video analyzer that maintains experiment state across batches"""
     
     def __init__(self, experiment_id: str):
         self.experiment_state = ExperimentState(experiment_id=experiment_id)
+        EXPERIMENT_REGISTRY[experiment_id] = self.experiment_state
         self.batch_count = 0
+        # Per-experiment ID sequences; avoids an os.urandom read per event
+        self._transfer_counter = itertools.count()
+        self._warning_counter = itertools.count()
+        self._batch_timestamp: Optional[datetime] = None
+        # (state version, batch count) -> last summary built from them
+        self._summary_cache: Optional[Tuple[Tuple[int, int], Dict[str, Any]]] = None
     
     def process_batch_with_enhanced_tracking(
         self, 
@@ -39,25 +98,33 @@ class EnhancedVideoAnalyzer:
         """
         
         self.batch_count += 1
+        # One wall-clock read per batch; every event in it shares this timestamp
+        self._batch_timestamp = datetime.now()
         
-        # Start with the original AI analysis
-        enhanced_analysis = ai_analysis_result.model_copy()
-        enhanced_analysis.frame_range = f"batch_{self.batch_count}"
-        enhanced_analysis.analysis_confidence = 0.85  # Example confidence score
+        # Gather every enhanced field first, then copy the AI analysis once
+        updates: Dict[str, Any] = {
+            "frame_range": f"batch_{self.batch_count}",
+            "analysis_confidence": 0.85,  # Example confidence score
+        }
         
         # Enhanced tracking based on the thinking/analysis
+        # (text is lowercased once here and shared with the extractors)
         if ai_analysis_result.thinking:
-            self._extract_enhanced_events_from_thinking(
-                ai_analysis_result.thinking, 
-                enhanced_analysis
-            )
+            updates.update(self._extract_enhanced_events_from_thinking(
+                ai_analysis_result.thinking.lower(), 
+                ai_analysis_result
+            ))
         
         # Update pipette state if needed
         if ai_analysis_result.protocol_log_triggered and ai_analysis_result.protocol_log:
-            self._update_pipette_state_from_log(
+            updates.update(self._update_pipette_state_from_log(
                 ai_analysis_result.protocol_log,
-                enhanced_analysis
-            )
+                ai_analysis_result.protocol_log.lower()
+            ))
+        
+        updates["experiment_state_updated"] = True
+        
+        enhanced_analysis = ai_analysis_result.model_copy(update=updates)
         
         # Process any detected transfers
         if enhanced_analysis.transfers_detected:
@@ -74,40 +141,41 @@ class EnhancedVideoAnalyzer:
             for discrepancy in enhanced_analysis.volume_discrepancies_detected:
                 self.experiment_state.add_volume_discrepancy(discrepancy)
         
-        # Update the experiment state in the analysis
-        enhanced_analysis.experiment_state_updated = True
-        enhanced_analysis.experiment_state = self.experiment_state
+        # Pipette changes are made in place, so record them as a state change too
+        if enhanced_analysis.pipette_state_changed:
+            self.experiment_state.version += 1
+        # Reference the experiment state by id and version instead of embedding it
+        enhanced_analysis.attach_experiment_state(self.experiment_state)
         
         return enhanced_analysis
     
     def _extract_enhanced_events_from_thinking(
         self, 
-        thinking: str, 
+        thinking_lower: str, 
         analysis: VideoAnalysis
-    ):
-        """Extract specific events from the AI's thinking text"""
+    ) -> Dict[str, Any]:
+        """Extract specific events from the AI's (already lowercased) thinking text.
         
-        thinking_lower = thinking.lower()
+        Returns the VideoAnalysis fields to update; ``analysis`` is only read.
+        """
+        
+        updates: Dict[str, Any] = {}
+        transfers: List[ReagentTransfer] = []
+        warnings: List[ContaminationWarning] = []
         
         # Detect key events
-        key_events = []
+        hits, key_events, dispensed_well = _classify_thinking(thinking_lower)
         
-        if "pipette" in thinking_lower and "volume" in thinking_lower:
-            key_events.append("pipette_volume_change")
-            
+        if "pipette_volume_change" in key_events:
             # Try to extract volume setting
-            if "30" in thinking:
-                if not self.experiment_state.pipette_state:
-                    self.experiment_state.pipette_state = PipetteState()
+            if "30" in hits:
                 self.experiment_state.pipette_state.volume_setting_ul = 30.0
-                analysis.pipette_state_changed = True
-                analysis.new_pipette_state = self.experiment_state.pipette_state
+                updates["pipette_state_changed"] = True
+                updates["new_pipette_state"] = self.experiment_state.pipette_state
         
-        if "aspirat" in thinking_lower:
-            key_events.append("aspiration_detected")
-            
+        if "aspiration_detected" in key_events:
             # Detect reagent aspiration
-            if "orange" in thinking_lower or "reagent a" in thinking_lower:
+            if "orange" in hits or "reagent a" in hits:
                 reagent = Reagent(
                     name="Reagent A",
                     volume_ul=30.0,
@@ -115,34 +183,21 @@ class EnhancedVideoAnalyzer:
                     color="orange-brown"
                 )
                 
-                if not self.experiment_state.pipette_state:
-                    self.experiment_state.pipette_state = PipetteState()
-                
                 self.experiment_state.pipette_state.last_reagent_aspirated = reagent
                 self.experiment_state.pipette_state.last_action = PipetteAction.ASPIRATE
-                self.experiment_state.pipette_state.action_timestamp = datetime.now()
+                self.experiment_state.pipette_state.action_timestamp = self._batch_timestamp
                 
-                analysis.pipette_state_changed = True
-                analysis.new_pipette_state = self.experiment_state.pipette_state
+                updates["pipette_state_changed"] = True
+                updates["new_pipette_state"] = self.experiment_state.pipette_state
         
-        if "dispens" in thinking_lower:
-            key_events.append("dispensing_detected")
-            
-            # Try to detect well dispense
-            well_indicators = ["a1", "a2", "a3", "b1", "b2", "b3"]
-            dispensed_well = None
-            
-            for well in well_indicators:
-                if well in thinking_lower:
-                    dispensed_well = well.upper()
-                    break
-            
-            if dispensed_well and self.experiment_state.pipette_state:
+        if "dispensing_detected" in key_events:
+            if dispensed_well:
                 pipette = self.experiment_state.pipette_state
                 if pipette.last_reagent_aspirated:
                     # Create transfer
                     transfer = ReagentTransfer(
-                        transfer_id=str(uuid.uuid4()),
+                        timestamp=self._batch_timestamp,
+                        transfer_id=f"{self.experiment_state.experiment_id}-T{next(self._transfer_counter):06d}",
                         reagent=pipette.last_reagent_aspirated,
                         source_container=pipette.last_reagent_aspirated.source_container or "UNKNOWN",
                         destination_well=dispensed_well,
@@ -153,30 +208,26 @@ class EnhancedVideoAnalyzer:
                         tip_contamination_after=ContaminationLevel.POTENTIALLY_CONTAMINATED
                     )
                     
-                    analysis.transfers_detected.append(transfer)
+                    transfers.append(transfer)
                     
                     # Update pipette state
                     pipette.last_action = PipetteAction.DISPENSE
                     pipette.tip_contamination_level = ContaminationLevel.POTENTIALLY_CONTAMINATED
                     pipette.last_reagent_aspirated = None  # Tip now empty
         
-        if "tip" in thinking_lower and ("change" in thinking_lower or "attach" in thinking_lower):
-            key_events.append("tip_change_detected")
-            
-            if not self.experiment_state.pipette_state:
-                self.experiment_state.pipette_state = PipetteState()
-            
+        if "tip_change_detected" in key_events:
             self.experiment_state.pipette_state.tip_attached = True
             self.experiment_state.pipette_state.tip_contamination_level = ContaminationLevel.CLEAN
             self.experiment_state.pipette_state.tip_id = f"TIP-{self.batch_count:03d}"
             
-            analysis.pipette_state_changed = True
-            analysis.new_pipette_state = self.experiment_state.pipette_state
+            updates["pipette_state_changed"] = True
+            updates["new_pipette_state"] = self.experiment_state.pipette_state
         
         # Check for contamination risks
-        if any(word in thinking_lower for word in ["contamination", "cross", "dirty", "residue"]):
+        if any(word in hits for word in _CONTAMINATION_KEYWORDS):
             warning = ContaminationWarning(
-                warning_id=str(uuid.uuid4()),
+                timestamp=self._batch_timestamp,
+                warning_id=f"{self.experiment_state.experiment_id}-W{next(self._warning_counter):06d}",
                 warning_type=WarningType.CROSS_CONTAMINATION,
                 severity=WarningSeverity.MEDIUM,
                 contamination_source="Detected during video analysis",
@@ -184,67 +235,86 @@ class EnhancedVideoAnalyzer:
                 description="Potential contamination detected in video frames",
                 recommended_action="Review pipetting technique and tip usage"
             )
-            analysis.contamination_warnings_detected.append(warning)
+            warnings.append(warning)
         
-        analysis.key_events_detected = key_events
+        if transfers:
+            updates["transfers_detected"] = analysis.transfers_detected + transfers
+        if warnings:
+            updates["contamination_warnings_detected"] = (
+                analysis.contamination_warnings_detected + warnings
+            )
+        updates["key_events_detected"] = key_events
+        return updates
     
-    def _update_pipette_state_from_log(self, protocol_log: str, analysis: VideoAnalysis):
-        """Update pipette state based on protocol log entries"""
-        
-        log_lower = protocol_log.lower()
+    def _update_pipette_state_from_log(self, protocol_log: str, log_lower: str) -> Dict[str, Any]:
+        """Update pipette state based on protocol log entries; returns VideoAnalysis updates"""
         
-        # Initialize pipette state if needed
-        if not self.experiment_state.pipette_state:
-            self.experiment_state.pipette_state = PipetteState()
+        updates: Dict[str, Any] = {}
         
         pipette = self.experiment_state.pipette_state
         
         # Extract volume changes
-        if "volume" in log_lower and "set" in log_lower:
+        if all(keyword in log_lower for keyword in _VOLUME_SET_KEYWORDS):
             # Try to extract volume number
-            import re
-            volume_match = re.search(r'(\d+)(?:\.\d+)?\s*[µu]?l', protocol_log, re.IGNORECASE)
+            volume_match = _VOLUME_RE.search(protocol_log)
             if volume_match:
                 volume = float(volume_match.group(1))
                 pipette.volume_setting_ul = volume
-                analysis.pipette_state_changed = True
-                analysis.new_pipette_state = pipette
+                updates["pipette_state_changed"] = True
+                updates["new_pipette_state"] = pipette
         
         # Track reagent aspiration
         if "aspirat" in log_lower:
             # Simple reagent detection
-            if "reagent a" in log_lower or "orange" in log_lower:
+            if any(keyword in log_lower for keyword in _REAGENT_A_KEYWORDS):
                 reagent = Reagent(name="Reagent A", volume_ul=pipette.volume_setting_ul, color="orange")
                 pipette.last_reagent_aspirated = reagent
                 pipette.last_action = PipetteAction.ASPIRATE
-                analysis.pipette_state_changed = True
+                updates["pipette_state_changed"] = True
+        
+        return updates
     
     def get_experiment_summary(self) -> Dict[str, Any]:
-        """Get current experiment summary for monitoring"""
-        return {
+        """Get current experiment summary for monitoring.
+        
+        Rebuilt only when the experiment state or batch count has changed since
+        the last call, so frequent HUD polling reuses the cached dict.
+        """
+        cache_key = (self.experiment_state.version, self.batch_count)
+        if self._summary_cache is not None and self._summary_cache[0] == cache_key:
+            return self._summary_cache[1]
+        
+        pipette = self.experiment_state.pipette_state
+        summary = {
             "experiment_id": self.experiment_state.experiment_id,
             "batches_processed": self.batch_count,
             "total_transfers": len(self.experiment_state.all_transfers),
+            "total_volume_transferred_ul": self.experiment_state.total_volume_transferred_ul(),
             "wells_with_content": len(self.experiment_state.wells),
             "contamination_warnings": len(self.experiment_state.contamination_warnings),
             "volume_discrepancies": len(self.experiment_state.volume_discrepancies),
             "current_pipette_state": {
-                "volume_setting": self.experiment_state.pipette_state.volume_setting_ul if self.experiment_state.pipette_state else "N/A",
-                "tip_attached": self.experiment_state.pipette_state.tip_attached if self.experiment_state.pipette_state else False,
-                "contamination_level": self.experiment_state.pipette_state.tip_contamination_level.value if self.experiment_state.pipette_state else "unknown",
-                "last_action": self.experiment_state.pipette_state.last_action.value if self.experiment_state.pipette_state else "idle"
+                "volume_setting": pipette.volume_setting_ul,
+                "tip_attached": pipette.tip_attached,
+                "contamination_level": pipette.tip_contamination_level.value,
+                "last_action": pipette.last_action.value
             },
             "hud_data": self.experiment_state.get_hud_summary()
         }
+        self._summary_cache = (cache_key, summary)
+        return summary
 
 
 def demonstrate_enhanced_integration():
     """Demonstrate integration with existing video analysis workflow"""
     
-    print("=" * 70)
-    print("ENHANCED VIDEO ANALYSIS INTEGRATION DEMO")
-    print("=" * 70)
-    print()
+    # Report lines are buffered and written to stdout in one go at the end
+    lines: List[str] = []
+    
+    lines.append("=" * 70)
+    lines.append("ENHANCED VIDEO ANALYSIS INTEGRATION DEMO")
+    lines.append("=" * 70)
+    lines.append("")
     
     # Initialize enhanced analyzer
     analyzer = EnhancedVideoAnalyzer("DEMO-EXP-001")
@@ -283,8 +353,8 @@ def demonstrate_enhanced_integration():
     
     # Process each batch
     for i, batch in enumerate(sample_batches, 1):
-        print(f"📹 Processing Batch {i}:")
-        print(f"   Frames: {len(batch['frames'])} frames")
+        lines.append(f"📹 Processing Batch {i}:")
+        lines.append(f"   Frames: {len(batch['frames'])} frames")
         
         # Process with enhanced tracking
         enhanced_result = analyzer.process_batch_with_enhanced_tracking(
@@ -293,71 +363,74 @@ def demonstrate_enhanced_integration():
         )
         
         # Show enhanced results
-        print(f"   Key events detected: {enhanced_result.key_events_detected}")
-        print(f"   Transfers detected: {len(enhanced_result.transfers_detected)}")
-        print(f"   Contamination warnings: {len(enhanced_result.contamination_warnings_detected)}")
-        print(f"   Pipette state changed: {enhanced_result.pipette_state_changed}")
+        lines.append(f"   Key events detected: {enhanced_result.key_events_detected}")
+        lines.append(f"   Transfers detected: {len(enhanced_result.transfers_detected)}")
+        lines.append(f"   Contamination warnings: {len(enhanced_result.contamination_warnings_detected)}")
+        lines.append(f"   Pipette state changed: {enhanced_result.pipette_state_changed}")
         
         if enhanced_result.transfers_detected:
             for transfer in enhanced_result.transfers_detected:
-                print(f"   → Transfer: {transfer.reagent.name} to {transfer.destination_well}")
+                lines.append(f"   → Transfer: {transfer.reagent.name} to {transfer.destination_well}")
         
         if enhanced_result.contamination_warnings_detected:
             for warning in enhanced_result.contamination_warnings_detected:
-                print(f"   ⚠️  Warning: {warning.description}")
+                lines.append(f"   ⚠️  Warning: {warning.description}")
         
-        print()
+        lines.append("")
     
     # Show final experiment summary
-    print("📊 FINAL EXPERIMENT SUMMARY:")
+    lines.append("📊 FINAL EXPERIMENT SUMMARY:")
     summary = analyzer.get_experiment_summary()
     
-    print(f"   Experiment ID: {summary['experiment_id']}")
-    print(f"   Batches processed: {summary['batches_processed']}")
-    print(f"   Total transfers: {summary['total_transfers']}")
-    print(f"   Wells with content: {summary['wells_with_content']}")
-    print(f"   Contamination warnings: {summary['contamination_warnings']}")
-    print()
+    lines.append(f"   Experiment ID: {summary['experiment_id']}")
+    lines.append(f"   Batches processed: {summary['batches_processed']}")
+    lines.append(f"   Total transfers: {summary['total_transfers']}")
+    lines.append(f"   Wells with content: {summary['wells_with_content']}")
+    lines.append(f"   Contamination warnings: {summary['contamination_warnings']}")
+    lines.append("")
     
-    print("🎛️  CURRENT PIPETTE STATE:")
+    lines.append("🎛️  CURRENT PIPETTE STATE:")
     pipette_state = summary['current_pipette_state']
     for key, value in pipette_state.items():
-        print(f"   {key.replace('_', ' ').title()}: {value}")
-    print()
+        lines.append(f"   {key.replace('_', ' ').title()}: {value}")
+    lines.append("")
     
-    print("📺 HUD DATA FOR OVERLAY:")
+    lines.append("📺 HUD DATA FOR OVERLAY:")
     hud_data = summary['hud_data']
     for key, value in hud_data.items():
-        print(f"   {key}: {value}")
-    print()
+        lines.append(f"   {key}: {value}")
+    lines.append("")
     
     # Show how to query the data
-    print("🔍 EXAMPLE QUERIES:")
+    lines.append("🔍 EXAMPLE QUERIES:")
     
     # Find all transfers
     all_transfers = analyzer.experiment_state.all_transfers
-    print(f"   • All transfers: {len(all_transfers)}")
+    lines.append(f"   • All transfers: {len(all_transfers)}")
     
     # Find contamination warnings
     warnings = analyzer.experiment_state.contamination_warnings
-    print(f"   • Contamination warnings: {len(warnings)}")
+    lines.append(f"   • Contamination warnings: {len(warnings)}")
     
     # Check specific wells
     if "A1" in analyzer.experiment_state.wells:
         a1_volume = analyzer.experiment_state.wells["A1"].total_volume_ul
-        print(f"   • A1 total volume: {a1_volume}µl")
+        lines.append(f"   • A1 total volume: {a1_volume}µl")
     
     # Check current contamination risk
     risk_level = analyzer.experiment_state.contamination_risk_level
-    print(f"   • Overall contamination risk: {risk_level.value}")
+    lines.append(f"   • Overall contamination risk: {risk_level.value}")
+    
+    lines.append("")
+    lines.append("=" * 70)
+    lines.append("INTEGRATION COMPLETE!")
+    lines.append("This shows how to enhance your existing VideoAnalysis")
+    lines.append("with comprehensive state tracking for HUD overlays and")
+    lines.append("advanced 'needle in the haystack' queries.")
+    lines.append("=" * 70)
     
-    print()
-    print("=" * 70)
-    print("INTEGRATION COMPLETE!")
-    print("This shows how to enhance your existing VideoAnalysis")
-    print("with comprehensive state tracking for HUD overlays and")
-    print("advanced 'needle in the haystack' queries.")
-    print("=" * 70)
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 
 if __name__ == "__main__":
@@ -1,57 +1,76 @@
 from inference_sdk import InferenceHTTPClient
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
 import sys
+import contextvars
 import cv2
+import hashlib
 import json
+import logging
+import numpy as np
+import orjson
 import os
+import shutil
+import tempfile
+import threading
+import time
 
-# Create data directories if they don't exist
+try:
+    from numba import njit  # optional: compiles the selection loop
+except ImportError:
+    njit = None
+
+logger = logging.getLogger(__name__)
+# Final per-image outcome; the CLI keeps it at INFO so it shows at the default LOGLEVEL
+result_logger = logging.getLogger(f"{__name__}.result")
+
+API_URL = "https://serverless.roboflow.com"
+WORKSPACE_NAME = "test-ymb2o"
+SOURCE_WORKFLOW_ID = "custom-workflow-2"
+DESTINATION_WORKFLOW_ID = "custom-workflow-3"
+
+# Workflow responses are cached on disk by image content hash + workflow id
+CACHE_DIR = 'data/cache'
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Directory mode picks up these files and labels them on a thread pool
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+BATCH_WORKERS = 8
+# Images sent to each workflow per run_workflow request in directory mode
+WORKFLOW_BATCH_SIZE = 8
+
+# imread flags that let libjpeg downscale while decoding, keyed by scale factor
+DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# Create data directories if they don't exist (once per process)
+@lru_cache(maxsize=1)
 def ensure_data_directories():
     """Ensure the data directory structure exists."""
-    directories = ['data/json', 'data/original', 'data/annotated']
+    directories = ['data/json', 'data/original', 'data/annotated', CACHE_DIR]
     for directory in directories:
         os.makedirs(directory, exist_ok=True)
 
-def find_source_prediction_with_smallest_y(result):
-    """Find the source prediction with the smallest y coordinate from the result."""
-    # Handle if result is a list (as from Roboflow API)
-    if isinstance(result, list):
-        if len(result) == 0:
-            return None
-        result = result[0]
-
-    if not result or 'predictions' not in result:
-        return None
-    
-    predictions_container = result['predictions']
-    predictions = predictions_container.get('predictions', None)
-    if not predictions:
-        return None
-    
-    # Find prediction with smallest y coordinate
-    min_y_prediction = None
-    min_y = float('inf')
-    
-    for i, prediction in enumerate(predictions):
-        y_coord = None
-        
-        # Handle different prediction formats
-        if 'x' in prediction and 'y' in prediction and 'width' in prediction and 'height' in prediction:
-            if prediction['height'] > 500:
-                continue
-            y_coord = prediction['y']
-        elif 'bbox' in prediction:
-            bbox = prediction['bbox']
-            if len(bbox) >= 4:
-                y_coord = bbox[1]
-        
-        if y_coord is not None and y_coord < min_y:
-            min_y = y_coord
-            min_y_prediction = prediction
-    
-    return min_y_prediction
+@dataclass(slots=True)
+class BBox:
+    """A prediction normalized to center coordinates, whichever format it came in."""
+    cx: float
+    cy: float
+    w: float
+    h: float
+    conf: float
+    cls: str
+    from_bbox: bool = False  # came in the [x, y, width, height] 'bbox' format
+    prediction: dict = field(default=None, repr=False, compare=False)  # the Roboflow dict it was parsed from
 
-def get_destination_predictions_above_confidence(result, confidence_threshold=0.1):
-    """Get all destination predictions above the confidence threshold."""
+def normalize_predictions(result):
+    """Parse a workflow result into a list of BBox, dropping predictions without coordinates."""
     # Handle if result is a list (as from Roboflow API)
     if isinstance(result, list):
         if len(result) == 0:
@@ -61,271 +80,473 @@ def get_destination_predictions_above_confidence(result, confidence_threshold=0.
     if not result or 'predictions' not in result:
         return []
     
-    predictions_container = result['predictions']
-    predictions = predictions_container.get('predictions', None)
+    predictions = result['predictions'].get('predictions', None)
     if not predictions:
         return []
     
-    # Filter predictions above confidence threshold
-    high_confidence_predictions = []
-    
+    boxes = []
     for prediction in predictions:
-        confidence = prediction.get('confidence', 0)
-        if confidence >= confidence_threshold:
-            high_confidence_predictions.append(prediction)
+        if 'x' in prediction and 'y' in prediction and 'width' in prediction and 'height' in prediction:
+            # Format: separate x, y, width, height fields where x, y are center coordinates
+            cx, cy, w, h = prediction['x'], prediction['y'], prediction['width'], prediction['height']
+            from_bbox = False
+        elif len(prediction.get('bbox', ())) >= 4:
+            # Format: [x, y, width, height] where x, y are center coordinates
+            cx, cy, w, h = prediction['bbox'][:4]
+            from_bbox = True
+        else:
+            continue
+        boxes.append(BBox(cx, cy, w, h, prediction.get('confidence', 0), prediction.get('class', 'Unknown'), from_bbox, prediction))
+    return boxes
+
+def min_y_index(ys, heights, max_height):
+    """Index of the smallest y among boxes no taller than max_height, or -1."""
+    masked = np.where(heights > max_height, np.inf, ys)
+    index = int(np.argmin(masked))
+    return index if masked[index] < np.inf else -1
+
+if njit is not None:
+    @njit(cache=True)
+    def min_y_index(ys, heights, max_height):
+        """Index of the smallest y among boxes no taller than max_height, or -1."""
+        best = -1
+        best_y = np.inf
+        for i in range(ys.size):
+            if heights[i] <= max_height and ys[i] < best_y:
+                best_y = ys[i]
+                best = i
+        return best
+
+def find_source_prediction_with_smallest_y(boxes):
+    """Find the source box with the smallest y coordinate, ignoring boxes taller than 500px.
+
+    As before normalization, the height cutoff only applies to boxes that came
+    with a separate height field; 'bbox'-format boxes are never filtered.
+    """
+    if not boxes:
+        return None
+    
+    ys = np.fromiter((b.cy for b in boxes), dtype=np.float64, count=len(boxes))
+    heights = np.fromiter((0.0 if b.from_bbox else b.h for b in boxes), dtype=np.float64, count=len(boxes))
+    
+    # Find prediction with smallest y coordinate (the first one on ties)
+    index = min_y_index(ys, heights, 500.0)
+    return boxes[index] if index >= 0 else None
+
+def get_destination_predictions_above_confidence(boxes, confidence_threshold=0.1):
+    """Get all destination boxes above the confidence threshold."""
+    if not boxes:
+        return []
     
-    return high_confidence_predictions
+    # Filter predictions above confidence threshold in one vectorized comparison
+    confidences = np.fromiter((b.conf for b in boxes), dtype=np.float64, count=len(boxes))
+    keep = np.flatnonzero(confidences >= confidence_threshold)
+    return [boxes[i] for i in keep.tolist()]
 
-def select_destination_box_by_position(predictions, position_from_right):
+def select_destination_box_by_position(boxes, position_from_right):
     """Select a destination box by position from the right (1 = rightmost)."""
-    if not predictions:
+    if not boxes:
         return []
     
-    # Sort predictions by x coordinate (right to left)
-    sorted_predictions = sorted(predictions, key=lambda p: p.get('x', 0) if 'x' in p else p.get('bbox', [0])[0], reverse=True)
+    xs = np.fromiter((b.cx for b in boxes), dtype=np.float64, count=len(boxes))
     
-    # Select the specified position from the right
-    if position_from_right <= len(sorted_predictions):
-        selected_prediction = sorted_predictions[position_from_right - 1]
-        return [selected_prediction]
-    else:
-        # If position is too large, return the leftmost one (last in sorted list)
-        return [sorted_predictions[-1]] if sorted_predictions else []
-
-def draw_single_bounding_box(image, prediction, color=(0, 255, 0), thickness=2):
-    """Draw a single bounding box on the image."""
-    # Extract bounding box coordinates (treating x, y as center points)
-    if 'bbox' in prediction:
-        # Format: [x, y, width, height] where x, y are center coordinates
-        bbox = prediction['bbox']
-        center_x, center_y, w, h = int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3])
-        # Convert center coordinates to top-left coordinates
-        x = center_x - w // 2
-        y = center_y - h // 2
-    elif 'x' in prediction and 'y' in prediction and 'width' in prediction and 'height' in prediction:
-        # Format: separate x, y, width, height fields where x, y are center coordinates
-        center_x, center_y = int(prediction['x']), int(prediction['y'])
-        w, h = int(prediction['width']), int(prediction['height'])
-        # Convert center coordinates to top-left coordinates
-        x = center_x - w // 2
-        y = center_y - h // 2
-    else:
-        print("Error: Could not extract bounding box coordinates from prediction")
-        return False
-    
-    # Draw the bounding box
-    cv2.rectangle(image, (x, y), (x + w, y + h), color, thickness)
+    # If position is too large, fall back to the leftmost box
+    k = min(position_from_right, len(xs)) - 1
+    if k == 0:
+        return [boxes[int(np.argmax(xs))]]
     
-    return True
+    # Find the k-th largest x without a full sort, then break ties in list
+    # order so the result matches a stable right-to-left sort
+    kth_x = -np.partition(-xs, k)[k]
+    rank = k - int(np.count_nonzero(xs > kth_x))
+    index = int(np.flatnonzero(xs == kth_x)[rank])
+    return [boxes[index]]
 
-def draw_source_bounding_box(image_path, prediction, output_path):
-    """Draw source bounding box on image and save it."""
-    # Read the image
-    image = cv2.imread(image_path)
-    if image is None:
-        print(f"Error: Could not read image {image_path}")
-        return False
-    
-    # Draw the bounding box
-    success = draw_single_bounding_box(image, prediction, color=(0, 255, 0), thickness=2)
-    
-    if success:
-        # Save the annotated image
-        cv2.imwrite(output_path, image)
-        print(f"Source annotated image saved to: {output_path}")
-        return True
-    else:
-        return False
+def box_corners(boxes, scale=1):
+    """Integer top-left and bottom-right corners for each box, computed in one vectorized step.
 
-def draw_destination_bounding_boxes(image_path, predictions, output_path):
-    """Draw all destination bounding boxes on image and save it."""
-    # Read the image
-    image = cv2.imread(image_path)
-    if image is None:
-        print(f"Error: Could not read image {image_path}")
-        return False
-    
-    # Draw all bounding boxes
-    success_count = 0
-    for prediction in predictions:
-        success = draw_single_bounding_box(image, prediction, color=(255, 0, 0), thickness=2)
-        if success:
-            success_count += 1
-    
-    # Save the annotated image
-    cv2.imwrite(output_path, image)
-    print(f"Destination annotated image saved to: {output_path}")
-    print(f"Drew {success_count} bounding boxes out of {len(predictions)} predictions")
-    return True
-
-def draw_combined_annotations(image_path, source_prediction, destination_predictions, output_path):
-    """Draw both source and destination annotations on the same image."""
-    # Read the image
-    image = cv2.imread(image_path)
-    if image is None:
-        print(f"Error: Could not read image {image_path}")
-        return False
-    
+    Coordinates are divided by scale to match an image decoded at reduced size.
+    """
+    # Truncate to int first so the math matches int(cx) - int(w) // 2 per box
+    xywh = (np.array([(b.cx, b.cy, b.w, b.h) for b in boxes], dtype=np.float64).reshape(-1, 4) / scale).astype(np.int32)
+    top_left = xywh[:, :2] - xywh[:, 2:] // 2
+    bottom_right = top_left + xywh[:, 2:]
+    return top_left.tolist(), bottom_right.tolist()
+
+def draw_combined_annotations(image, source_prediction, destination_predictions, output_path, executor, verbose=True, scale=1):
+    """Draw both source and destination annotations on a decoded image.
+
+    scale is the factor the image was reduced by when decoded. With verbose
+    set, each destination box is reported as it is drawn.
+    The JPEG is encoded here and written to output_path on executor; returns
+    the write future, or None if encoding failed.
+    """
     success_count = 0
     
     # Draw source bounding box in cyan
     if source_prediction:
-        success = draw_single_bounding_box(image, source_prediction, color=(255, 255, 0), thickness=2)
-        if success:
-            success_count += 1
-            print("Drew source bounding box (cyan)")
-    
-    # Draw destination bounding boxes in green
-    for prediction in destination_predictions:
-        success = draw_single_bounding_box(image, prediction, color=(0, 255, 0), thickness=2)
-        if success:
-            success_count += 1
-    
-    # Save the combined annotated image
-    cv2.imwrite(output_path, image)
-    print(f"Combined annotated image saved to: {output_path}")
-    print(f"Drew {success_count} total bounding boxes (1 source + {len(destination_predictions)} destinations)")
-    return True
-
-def run_source_workflow(client, image_path, base_name):
-    """Run the source workflow (custom-workflow-2) and process results."""
-    print("Running source workflow (custom-workflow-2)...")
-    
-    result = client.run_workflow(
-        workspace_name="test-ymb2o",
-        workflow_id="custom-workflow-2",
-        images={"image": image_path},
-        use_cache=True
-    )
+        ((x1, y1),), ((x2, y2),) = box_corners([source_prediction], scale)
+        cv2.rectangle(image, (x1, y1), (x2, y2), (255, 255, 0), 2)
+        success_count += 1
+        logger.info("Drew source bounding box (cyan)")
+    
+    # Draw destination bounding boxes in green; only cv2.rectangle runs per box
+    top_left, bottom_right = box_corners(destination_predictions, scale)
+    for i, (box, (x1, y1), (x2, y2)) in enumerate(zip(destination_predictions, top_left, bottom_right)):
+        cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        success_count += 1
+        if verbose:
+            logger.info("Destination prediction %d: %s (confidence: %.3f)", i + 1, box.cls, box.conf)
+            logger.info("  Bounding box: x=%s, y=%s, width=%s, height=%s", box.cx, box.cy, box.w, box.h)
+    
+    logger.info("Drew %d total bounding boxes (1 source + %d destinations)", success_count, len(destination_predictions))
+    
+    # Encode in memory and hand the disk write to the executor
+    ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    if not ok:
+        logger.error("Could not encode annotated image for %s", output_path)
+        return None
+    return executor.submit(Path(output_path).write_bytes, buffer.tobytes())
+
+@lru_cache(maxsize=1)
+def get_client():
+    """Return the shared inference client, reading ROBOFLOW_API_KEY on first use."""
+    api_key = os.environ.get("ROBOFLOW_API_KEY")
+    if not api_key:
+        raise RuntimeError("ROBOFLOW_API_KEY environment variable is not set")
+    return InferenceHTTPClient(api_url=API_URL, api_key=api_key)
+
+def image_digest(image_path):
+    """SHA-256 of an image's bytes; hash once and pass it to every workflow."""
+    with open(image_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def get_cache_path(workflow_id, digest):
+    """Cache file for a workflow's result on the image with this content digest."""
+    return os.path.join(CACHE_DIR, f"{digest}_{workflow_id}.json")
+
+def read_cached_result(cache_path):
+    """Return a cached workflow result, or None if missing, stale or unreadable."""
+    try:
+        if time.time() - os.path.getmtime(cache_path) > CACHE_TTL_SECONDS:
+            return None
+        with open(cache_path, 'rb') as f:
+            return orjson.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+def write_cached_result(cache_path, result):
+    """Atomically store a workflow result in the cache.
+
+    Each writer gets its own temporary file, so concurrent writers of the
+    same key (identical images in one directory) cannot collide.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY))
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def save_results_json(json_output_path, result, pretty=False):
+    """Write a workflow result as compact orjson, or indented stdlib json when pretty."""
+    if pretty:
+        with open(json_output_path, 'w') as f:
+            json.dump(result, f, indent=2)
+    else:
+        # One os.write on a raw descriptor; no Python buffering layer in between
+        data = orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY)
+        fd = os.open(json_output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+def run_workflow_batch(client, workflow_id, image_paths, digests=None):
+    """Run one workflow over several images in a single request.
+
+    digests are the images' image_digest values, computed here if not given.
+    Images with a fresh cached result are skipped; only the rest are sent.
+    Returns one result per image, each shaped like a single-image response.
+    """
+    image_paths = list(image_paths)
+    if digests is None:
+        digests = [image_digest(path) for path in image_paths]
+    cache_paths = [get_cache_path(workflow_id, digest) for digest in digests]
+    results = [read_cached_result(cache_path) for cache_path in cache_paths]
+    
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        fresh_results = client.run_workflow(
+            workspace_name=WORKSPACE_NAME,
+            workflow_id=workflow_id,
+            images={"image": [image_paths[i] for i in missing]},
+            use_cache=True
+        )
+        for i, result in zip(missing, fresh_results):
+            results[i] = [result]
+            write_cached_result(cache_paths[i], results[i])
+    
+    return results
+
+def run_source_workflow(client, image_path, base_name, pretty=False, digest=None, result=None):
+    """Run the source workflow (custom-workflow-2) and process results.
+
+    result may be passed in when it was already fetched in a batch.
+    """
+    if result is None:
+        logger.info("Running source workflow (custom-workflow-2)...")
+        result = run_workflow_batch(client, SOURCE_WORKFLOW_ID, [image_path], [digest] if digest else None)[0]
 
     # Save raw results to JSON file in data/json directory
     json_output_path = f"data/json/{base_name}_source_results.json"
     
     try:
-        with open(json_output_path, 'w') as f:
-            json.dump(result, f, indent=2)
-        print(f"Source results saved to: {json_output_path}")
+        save_results_json(json_output_path, result, pretty)
+        logger.info("Source results saved to: %s", json_output_path)
     except Exception as e:
-        print(f"Warning: Could not save source results to JSON file: {e}")
+        logger.warning("Could not save source results to JSON file: %s", e)
 
     # Find prediction with smallest y coordinate
-    min_y_prediction = find_source_prediction_with_smallest_y(result)
+    min_y_prediction = find_source_prediction_with_smallest_y(normalize_predictions(result))
     
     if min_y_prediction:
-        # Extract y coordinate
-        if 'y' in min_y_prediction:
-            y_coord = min_y_prediction['y']
-        elif 'bbox' in min_y_prediction:
-            bbox = min_y_prediction['bbox']
-            y_coord = bbox[1]  # y (top of bbox)
-        else:
-            y_coord = "N/A"
-        
-        print(f"Source - Smallest y coordinate: {y_coord}")
-        
-        # Print bounding box information
-        if 'bbox' in min_y_prediction:
-            bbox = min_y_prediction['bbox']
-            print(f"Source bounding box: x={bbox[0]}, y={bbox[1]}, width={bbox[2]}, height={bbox[3]}")
-        elif 'x' in min_y_prediction and 'y' in min_y_prediction and 'width' in min_y_prediction and 'height' in min_y_prediction:
-            print(f"Source bounding box: x={min_y_prediction['x']}, y={min_y_prediction['y']}, width={min_y_prediction['width']}, height={min_y_prediction['height']}")
-        else:
-            print("Source bounding box: Not available")
+        logger.info("Source - Smallest y coordinate: %s", min_y_prediction.cy)
+        logger.info("Source bounding box: x=%s, y=%s, width=%s, height=%s",
+                    min_y_prediction.cx, min_y_prediction.cy, min_y_prediction.w, min_y_prediction.h)
     else:
-        print("No source predictions found or could not determine smallest y coordinate")
+        logger.info("No source predictions found or could not determine smallest y coordinate")
     
     return result, min_y_prediction
 
-def run_destination_workflow(client, image_path, base_name):
-    """Run the destination workflow (custom-workflow-3) and process results."""
-    print("Running destination workflow (custom-workflow-3)...")
-    
-    result = client.run_workflow(
-        workspace_name="test-ymb2o",
-        workflow_id="custom-workflow-3",
-        images={"image": image_path},
-        use_cache=True
-    )
+def run_destination_workflow(client, image_path, base_name, pretty=False, digest=None, result=None):
+    """Run the destination workflow (custom-workflow-3) and process results.
+
+    result may be passed in when it was already fetched in a batch.
+    """
+    if result is None:
+        logger.info("Running destination workflow (custom-workflow-3)...")
+        result = run_workflow_batch(client, DESTINATION_WORKFLOW_ID, [image_path], [digest] if digest else None)[0]
 
     # Save raw results to JSON file in data/json directory
     json_output_path = f"data/json/{base_name}_destination_results.json"
     
     try:
-        with open(json_output_path, 'w') as f:
-            json.dump(result, f, indent=2)
-        print(f"Destination results saved to: {json_output_path}")
+        save_results_json(json_output_path, result, pretty)
+        logger.info("Destination results saved to: %s", json_output_path)
     except Exception as e:
-        print(f"Warning: Could not save destination results to JSON file: {e}")
+        logger.warning("Could not save destination results to JSON file: %s", e)
 
     # Get all predictions above confidence threshold
-    high_confidence_predictions = get_destination_predictions_above_confidence(result, confidence_threshold=0.1)
+    high_confidence_predictions = get_destination_predictions_above_confidence(normalize_predictions(result), confidence_threshold=0.1)
     
     if high_confidence_predictions:
-        print(f"Found {len(high_confidence_predictions)} destination predictions above confidence 0.1")
-        
-        # Print information about each prediction
-        for i, prediction in enumerate(high_confidence_predictions):
-            confidence = prediction.get('confidence', 0)
-            class_name = prediction.get('class', 'Unknown')
-            print(f"Destination prediction {i+1}: {class_name} (confidence: {confidence:.3f})")
-            
-            if 'bbox' in prediction:
-                bbox = prediction['bbox']
-                print(f"  Bounding box: x={bbox[0]}, y={bbox[1]}, width={bbox[2]}, height={bbox[3]}")
-            elif 'x' in prediction and 'y' in prediction and 'width' in prediction and 'height' in prediction:
-                print(f"  Bounding box: x={prediction['x']}, y={prediction['y']}, width={prediction['width']}, height={prediction['height']}")
+        logger.info("Found %d destination predictions above confidence 0.1", len(high_confidence_predictions))
     else:
-        print("No destination predictions found above confidence threshold 0.1")
+        logger.info("No destination predictions found above confidence threshold 0.1")
     
     return result, high_confidence_predictions
 
-def main(image_path, position_from_right=1):
-    # Ensure data directories exist
-    ensure_data_directories()
-    
-    client = InferenceHTTPClient(
-        api_url="https://serverless.roboflow.com",
-        api_key="DSd1LnH4byKZqx8JekgA"
-    )
+# Records logged while an image is processed, when the CLI groups them per image
+_image_log_records = contextvars.ContextVar('image_log_records', default=None)
+_log_write_lock = threading.Lock()
+
+class ImageLogHandler(logging.Handler):
+    """Write each image's log records to target as one uninterrupted block.
 
+    Records logged inside process_image are held in that image's own list and
+    written together when it finishes; anything logged outside an image goes
+    straight through.
+    """
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+
+    def emit(self, record):
+        records = _image_log_records.get()
+        if records is not None:
+            records.append(record)
+            return
+        with _log_write_lock:
+            self.target.handle(record)
+
+    def write_block(self, records):
+        with _log_write_lock:
+            for record in records:
+                self.target.handle(record)
+
+def write_image_log(records):
+    """Hand one image's buffered records to the CLI's ImageLogHandler, if it is installed."""
+    if not records:
+        return
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, ImageLogHandler):
+            handler.write_block(records)
+
+def process_image(client, image_path, position_from_right=1, pretty=False, decode_scale=1, digest=None, results=(None, None)):
+    """Run both workflows on one image, save its results and annotated image.
+
+    results holds the (source, destination) workflow results when they were
+    already fetched in a batch; missing ones are requested here.
+    """
+    records = []
+    token = _image_log_records.set(records)
+    try:
+        return _process_image(client, image_path, position_from_right, pretty, decode_scale, digest, results)
+    finally:
+        _image_log_records.reset(token)
+        write_image_log(records)
+
+def _process_image(client, image_path, position_from_right, pretty, decode_scale, digest, results):
     base_name = os.path.splitext(os.path.basename(image_path))[0]
-    
-    # Run source workflow
-    source_result, source_prediction = run_source_workflow(client, image_path, base_name)
-    
-    # Run destination workflow
-    destination_result, all_destination_predictions = run_destination_workflow(client, image_path, base_name)
-    
-    # Select the specific destination box based on position from right
-    destination_predictions = select_destination_box_by_position(all_destination_predictions, position_from_right)
-    
-    if destination_predictions:
-        print(f"Selected destination box at position {position_from_right} from the right")
-    else:
-        print("No destination boxes available to select")
-    
-    # Draw combined annotations on single image and save to data/annotated directory
-    output_path = f"data/annotated/{base_name}_combined_annotated.jpg"
-    success = draw_combined_annotations(image_path, source_prediction, destination_predictions, output_path)
+    # Hash the image once; both workflows key their cache entries on it
+    if digest is None:
+        digest = image_digest(image_path)
+    source_result, destination_result = results
+    
+    # Both workflows are independent network round-trips, so run them concurrently;
+    # each runs in a copy of this context so its records land in this image's buffer
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        source_future = executor.submit(contextvars.copy_context().run, run_source_workflow, client, image_path, base_name, pretty, digest, source_result)
+        destination_future = executor.submit(contextvars.copy_context().run, run_destination_workflow, client, image_path, base_name, pretty, digest, destination_result)
+        source_result, source_prediction = source_future.result()
+        destination_result, all_destination_predictions = destination_future.result()
+        
+        # Select the specific destination box based on position from right
+        destination_predictions = select_destination_box_by_position(all_destination_predictions, position_from_right)
+        
+        if destination_predictions:
+            logger.info("Selected destination box at position %d from the right", position_from_right)
+        else:
+            logger.info("No destination boxes available to select")
+        
+        # Draw combined annotations on single image and save to data/annotated directory
+        output_path = f"data/annotated/{base_name}_combined_annotated.jpg"
+        write_future = None
+        if source_prediction is None and not destination_predictions and decode_scale == 1 and image_path.lower().endswith(('.jpg', '.jpeg')):
+            # Nothing to draw on a JPEG kept at full size: copy the bytes instead of a decode/encode round-trip
+            logger.info("No boxes to draw, copying original image")
+            write_future = executor.submit(shutil.copyfile, image_path, output_path)
+        else:
+            image = cv2.imread(image_path, DECODE_FLAGS[decode_scale])
+            if image is None:
+                logger.error("Could not read image %s", image_path)
+            else:
+                write_future = draw_combined_annotations(image, source_prediction, destination_predictions, output_path, executor, scale=decode_scale)
+    
+    # Leaving the executor has joined the background write; surface its outcome
+    success = False
+    if write_future is not None:
+        try:
+            write_future.result()
+            success = True
+        except OSError as e:
+            logger.error("Could not write annotated image %s: %s", output_path, e)
     
     if success:
-        print(f"Successfully created combined annotated image: {output_path}")
+        result_logger.info("Successfully created combined annotated image: %s", output_path)
     else:
-        print("Failed to create combined annotated image")
+        result_logger.error("Failed to create combined annotated image for %s", image_path)
     
+    # Callers get the Roboflow prediction dicts, as before BBox existed
     return {
         'source_result': source_result,
         'destination_result': destination_result,
-        'source_prediction': source_prediction,
-        'destination_predictions': destination_predictions
+        'source_prediction': source_prediction.prediction if source_prediction is not None else None,
+        'destination_predictions': [box.prediction for box in destination_predictions]
     }
 
+def list_images(directory):
+    """Image files directly inside directory, sorted by name."""
+    return sorted(
+        entry.path for entry in os.scandir(directory)
+        if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+def main(image_path, position_from_right=1, pretty=False, decode_scale=1):
+    """Label one image, or every image in image_path when it is a directory.
+
+    Returns the result dict for a single image, or a dict of them keyed by
+    path for a directory. In directory mode a failure is logged with the
+    image's path and the run continues; an image that failed maps to None.
+    """
+    # Ensure data directories exist
+    ensure_data_directories()
+    
+    client = get_client()
+    
+    if not os.path.isdir(image_path):
+        return process_image(client, image_path, position_from_right, pretty, decode_scale)
+    
+    # Each workflow gets one request per WORKFLOW_BATCH_SIZE images; the
+    # per-image saving and drawing then overlaps the next batch's requests
+    image_paths = list_images(image_path)
+    logger.info("Processing %d images from %s", len(image_paths), image_path)
+    results = dict.fromkeys(image_paths)
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as executor:
+        futures = {}
+        for start in range(0, len(image_paths), WORKFLOW_BATCH_SIZE):
+            batch = image_paths[start:start + WORKFLOW_BATCH_SIZE]
+            # Images that can't be read are left out of the batch requests
+            readable, digests = [], []
+            for path, digest_future in [(path, executor.submit(image_digest, path)) for path in batch]:
+                try:
+                    digests.append(digest_future.result())
+                    readable.append(path)
+                except OSError as e:
+                    logger.error("Could not read image %s: %s", path, e)
+            source_future = executor.submit(run_workflow_batch, client, SOURCE_WORKFLOW_ID, readable, digests)
+            destination_future = executor.submit(run_workflow_batch, client, DESTINATION_WORKFLOW_ID, readable, digests)
+            try:
+                batch_results = list(zip(source_future.result(), destination_future.result()))
+            except Exception as e:
+                # process_image requests whatever is missing one image at a time
+                logger.error("Batch workflow request failed for %s: %s", ", ".join(readable), e)
+                batch_results = [(None, None)] * len(readable)
+            for path, digest, path_results in zip(readable, digests, batch_results):
+                futures[path] = executor.submit(
+                    process_image, client, path, position_from_right, pretty, decode_scale,
+                    digest, path_results
+                )
+        for path, future in futures.items():
+            try:
+                results[path] = future.result()
+            except Exception as e:
+                logger.error("Failed to label %s: %s", path, e)
+    return results
+
 if __name__ == "__main__":
+    # Write each image's log records to stderr as one block when that image is done,
+    # so images processed in parallel don't interleave their lines
+    stderr_handler = logging.StreamHandler(sys.stderr)
+    stderr_handler.setFormatter(logging.Formatter("%(message)s"))
+    logging.basicConfig(level=os.environ.get('LOGLEVEL', 'WARNING').upper(), handlers=[ImageLogHandler(stderr_handler)])
+    result_logger.setLevel(logging.INFO)
+    
     args = sys.argv[1:]
+    pretty = '--pretty' in args
+    args = [arg for arg in args if arg != '--pretty']
+    
+    # Parse decode scale option (default to full resolution)
+    decode_scale = 1
+    if '--decode-scale' in args:
+        flag_index = args.index('--decode-scale')
+        value = args[flag_index + 1] if flag_index + 1 < len(args) else None
+        del args[flag_index:flag_index + 2]
+        if value is not None and value.isdigit() and int(value) in DECODE_FLAGS:
+            decode_scale = int(value)
+        else:
+            logger.warning("Decode scale must be one of 1, 2, 4, 8, using 1")
+    
     if len(args) < 1 or len(args) > 2:
-        print("Usage: python label.py <image_path> [position_from_right]")
+        print("Usage: python label.py <image_path_or_directory> [position_from_right] [--pretty] [--decode-scale {1,2,4,8}]")
+        print("  A directory labels every .jpg/.jpeg/.png file inside it")
         print("  position_from_right: 1-6 (1 = rightmost, 5 = 5th from right, etc.)")
         print("  If position is too large, draws the leftmost box")
+        print("  --pretty: write indented JSON results instead of compact JSON")
+        print("  --decode-scale: decode and annotate the image at 1/N resolution")
         sys.exit(1)
     
     image_path = args[0]
@@ -336,15 +557,15 @@ if __name__ == "__main__":
         try:
             position_from_right = int(args[1])
             if position_from_right < 1:
-                print("Warning: Position must be >= 1, using 1")
+                logger.warning("Position must be >= 1, using 1")
                 position_from_right = 1
         except ValueError:
-            print("Warning: Invalid position, using 1")
+            logger.warning("Invalid position, using 1")
             position_from_right = 1
     
-    print(f"Processing image: {image_path}")
-    print(f"Selecting destination box at position {position_from_right} from the right")
+    logger.info("Processing image: %s", image_path)
+    logger.info("Selecting destination box at position %d from the right", position_from_right)
     
-    results = main(image_path, position_from_right)
+    results = main(image_path, position_from_right, pretty, decode_scale)
 
 
@@ -9,8 +9,20 @@ track contamination risks, and analyze experiment quality.
 
 import uuid
 import json
+import sys
+from bisect import bisect_right
+from collections import defaultdict
+from collections.abc import Sequence
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from enum import Enum
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+try:
+    import orjson  # optional: native serializer for the report dump
+except ImportError:
+    orjson = None
 
 from video_understanding.models import (
     ExperimentState, PipetteState, PipetteAction, ContaminationLevel,
@@ -18,98 +30,171 @@ from video_understanding.models import (
     WellContents, WarningType, WarningSeverity, TipContaminationHistory
 )
 
+# Ascending accuracy-rate cutoffs; a rate at or above cutoff i earns grade i + 1
+_GRADE_THRESHOLDS = (0.80, 0.90, 0.95)
+_GRADES = ("Poor", "Fair", "Good", "Excellent")
+
+# Enum member -> string value, looked up once per warning in report output
+_WARNING_TYPE_VALUE = {member: member.value for member in WarningType}
+_WARNING_SEVERITY_VALUE = {member: member.value for member in WarningSeverity}
+
+
+class ContaminationChain(Sequence):
+    """Contamination chain stored as parallel columns; row dicts are built only when read"""
+    
+    def __init__(self):
+        self.transfer_ids: List[str] = []
+        self.destinations: List[str] = []
+        self.contamination_before: List[ContaminationLevel] = []
+        self.contamination_after: List[ContaminationLevel] = []
+        self.timestamps: List[datetime] = []
+    
+    @classmethod
+    def from_transfers(cls, transfers: List[ReagentTransfer]) -> "ContaminationChain":
+        """Build the chain column by column from an already filtered transfer list"""
+        chain = cls()
+        chain.transfer_ids = [t.transfer_id for t in transfers]
+        chain.destinations = [t.destination_well for t in transfers]
+        chain.contamination_before = [t.tip_contamination_before for t in transfers]
+        chain.contamination_after = [t.tip_contamination_after for t in transfers]
+        chain.timestamps = [t.timestamp for t in transfers]
+        return chain
+    
+    def __len__(self) -> int:
+        return len(self.transfer_ids)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return {
+            "transfer_id": self.transfer_ids[index],
+            "destination": self.destinations[index],
+            "contamination_before": self.contamination_before[index].value,
+            "contamination_after": self.contamination_after[index].value,
+            "timestamp": self.timestamps[index].isoformat()
+        }
+
 
 class LabVideoAnalyzer:
     """Analyzer for performing complex queries on lab video data"""
     
     def __init__(self, experiment_state: ExperimentState):
         self.experiment = experiment_state
+        # reagent name -> transfers, rebuilt when the experiment changes
+        self._by_reagent: Optional[Dict[str, List[ReagentTransfer]]] = None
+        self._by_reagent_key: Optional[Tuple[int, int]] = None
+        # container id -> volume discrepancies, rebuilt the same way
+        self._disc_by_container: Optional[Dict[str, List[VolumeDiscrepancy]]] = None
+        self._disc_by_container_key: Optional[Tuple[int, int]] = None
+        # Report sections derived from transfers, wells and warnings, keyed on state version
+        self._aggregates: Optional[Dict[str, Any]] = None
+        self._aggregates_key: Optional[Tuple[int, int, int, int]] = None
+    
+    def _reagent_index(self) -> Dict[str, List[ReagentTransfer]]:
+        """Transfers grouped by reagent name, cached until the experiment changes"""
+        transfers = self.experiment.all_transfers
+        key = (self.experiment.version, len(transfers))
+        if self._by_reagent is None or self._by_reagent_key != key:
+            index = defaultdict(list)
+            for transfer in transfers:
+                index[transfer.reagent.name].append(transfer)
+            self._by_reagent = dict(index)
+            self._by_reagent_key = key
+        return self._by_reagent
+    
+    def _discrepancy_index(self) -> Dict[str, List[VolumeDiscrepancy]]:
+        """Volume discrepancies grouped by container, cached until the experiment changes"""
+        discrepancies = self.experiment.volume_discrepancies
+        key = (self.experiment.version, len(discrepancies))
+        if self._disc_by_container is None or self._disc_by_container_key != key:
+            index = defaultdict(list)
+            for disc in discrepancies:
+                index[disc.container_id].append(disc)
+            self._disc_by_container = dict(index)
+            self._disc_by_container_key = key
+        return self._disc_by_container
     
     def find_contamination_events(self, severity_threshold: WarningSeverity = WarningSeverity.MEDIUM) -> List[ContaminationWarning]:
         """Find all contamination events above a certain severity"""
-        severity_order = {
-            WarningSeverity.LOW: 1,
-            WarningSeverity.MEDIUM: 2,
-            WarningSeverity.HIGH: 3,
-            WarningSeverity.CRITICAL: 4
-        }
+        warnings = self.experiment.contamination_warnings
+        severity_threshold = WarningSeverity(severity_threshold)  # also accepts "high" etc.
+        critical = WarningSeverity.CRITICAL
+        if severity_threshold is critical:
+            # Nothing ranks above critical, so an identity check is enough
+            return [warning for warning in warnings if warning.severity is critical]
         
-        threshold_level = severity_order[severity_threshold]
-        return [
-            warning for warning in self.experiment.contamination_warnings
-            if severity_order[warning.severity] >= threshold_level
-        ]
+        return [warning for warning in warnings if warning.severity >= severity_threshold]
     
     def find_volume_discrepancies_by_well(self, well_id: str) -> List[VolumeDiscrepancy]:
         """Find all volume discrepancies for a specific well"""
-        return [
-            disc for disc in self.experiment.volume_discrepancies
-            if disc.container_id == well_id
-        ]
+        return list(self._discrepancy_index().get(well_id, ()))
     
     def find_transfers_by_reagent(self, reagent_name: str) -> List[ReagentTransfer]:
         """Find all transfers involving a specific reagent"""
-        return [
-            transfer for transfer in self.experiment.all_transfers
-            if transfer.reagent.name == reagent_name
-        ]
+        return list(self._reagent_index().get(reagent_name, ()))
     
     def find_cross_contamination_chain(self, reagent_name: str) -> Dict[str, Any]:
         """Trace potential cross-contamination chains for a reagent"""
-        contaminated_wells = set()
-        transfer_chain = []
-        
-        # Find all transfers of this reagent
-        reagent_transfers = self.find_transfers_by_reagent(reagent_name)
+        # Find all transfers of this reagent (read-only, so the cached index list is fine)
+        reagent_transfers = self._reagent_index().get(reagent_name, ())
         
-        for transfer in reagent_transfers:
-            # Check if tip was contaminated before or after transfer
-            if (transfer.tip_contamination_before != ContaminationLevel.CLEAN or 
-                transfer.tip_contamination_after != ContaminationLevel.CLEAN):
-                contaminated_wells.add(transfer.destination_well)
-                transfer_chain.append({
-                    "transfer_id": transfer.transfer_id,
-                    "destination": transfer.destination_well,
-                    "contamination_before": transfer.tip_contamination_before.value,
-                    "contamination_after": transfer.tip_contamination_after.value,
-                    "timestamp": transfer.timestamp.isoformat()
-                })
+        # Keep transfers where the tip was contaminated before or after
+        contaminated = [
+            t for t in reagent_transfers
+            if t.tip_contamination_before is not ContaminationLevel.CLEAN
+            or t.tip_contamination_after is not ContaminationLevel.CLEAN
+        ]
+        # dict.fromkeys de-duplicates while keeping first-seen order
+        contaminated_wells = list(dict.fromkeys(t.destination_well for t in contaminated))
+        transfer_chain = ContaminationChain.from_transfers(contaminated)
         
         return {
             "reagent": reagent_name,
-            "potentially_contaminated_wells": list(contaminated_wells),
+            "potentially_contaminated_wells": contaminated_wells,
             "contamination_chain": transfer_chain,
             "risk_level": "high" if len(contaminated_wells) > 1 else "low"
         }
     
-    def find_tip_changes_needed(self) -> List[Dict[str, Any]]:
-        """Identify when tip changes should have occurred"""
-        tip_change_events = []
+    def _scan_transfers(self) -> Tuple[List[Tuple[float, float]], Dict[str, List[ReagentTransfer]]]:
+        """Single pass over all transfers: measured (intended, actual) volumes and tip usage"""
+        volume_pairs = []
+        tip_usage = defaultdict(list)  # tip_id -> list of transfers
+        add_pair = volume_pairs.append
+        
+        for transfer in self.experiment.all_transfers:
+            actual = transfer.actual_volume_ul
+            if actual is not None:
+                add_pair((transfer.intended_volume_ul, actual))
+            
+            # Simulate tip tracking (in real implementation, this would come from video analysis)
+            tip_id = f"tip_{transfer.transfer_id[:8]}"  # Simplified tip tracking
+            tip_usage[tip_id].append(transfer)
         
+        return volume_pairs, tip_usage
+    
+    def _pipette_tip_events(self) -> List[Dict[str, Any]]:
+        """Tip change recommendation for the pipette's current tip, if it needs one"""
         # Analyze tip contamination history
         pipette = self.experiment.pipette_state
         if pipette and pipette.requires_tip_change():
-            tip_change_events.append({
+            return [{
                 "current_tip_id": pipette.tip_id,
                 "contamination_level": pipette.tip_contamination_level.value,
                 "contamination_events": len(pipette.tip_contamination_history),
                 "recommendation": "Change tip immediately"
-            })
-        
-        # Analyze transfers for potential contamination
-        tip_usage = {}  # tip_id -> list of transfers
-        
-        for transfer in self.experiment.all_transfers:
-            # Simulate tip tracking (in real implementation, this would come from video analysis)
-            tip_id = f"tip_{transfer.transfer_id[:8]}"  # Simplified tip tracking
-            if tip_id not in tip_usage:
-                tip_usage[tip_id] = []
-            tip_usage[tip_id].append(transfer)
+            }]
+        return []
+    
+    def _tip_change_events(self, tip_usage: Dict[str, List[ReagentTransfer]]) -> List[Dict[str, Any]]:
+        """Tip change recommendations for tips that touched more than one reagent"""
+        tip_change_events = []
         
         # Check for tips used across different reagents
         for tip_id, transfers in tip_usage.items():
-            reagents_used = set(t.reagent.name for t in transfers)
-            if len(reagents_used) > 1:
+            # Most tips touch one reagent; stop at the first different one before building a set
+            first_reagent = transfers[0].reagent.name
+            if next((t for t in transfers if t.reagent.name != first_reagent), None) is not None:
+                reagents_used = {t.reagent.name for t in transfers}
                 tip_change_events.append({
                     "tip_id": tip_id,
                     "reagents_contacted": list(reagents_used),
@@ -119,25 +204,24 @@ class LabVideoAnalyzer:
         
         return tip_change_events
     
-    def analyze_pipetting_accuracy(self) -> Dict[str, Any]:
-        """Analyze overall pipetting accuracy across the experiment"""
-        accurate_transfers = 0
+    def _accuracy_metrics(self, volume_pairs: List[Tuple[float, float]]) -> Dict[str, Any]:
+        """Accuracy summary from the volume pairs collected by _scan_transfers"""
         total_transfers = len(self.experiment.all_transfers)
-        volume_discrepancies = []
-        
-        for transfer in self.experiment.all_transfers:
-            if transfer.actual_volume_ul is not None:
-                discrepancy = abs(transfer.intended_volume_ul - transfer.actual_volume_ul)
-                relative_error = discrepancy / transfer.intended_volume_ul
-                
-                volume_discrepancies.append(relative_error)
-                
-                # Consider transfer accurate if within 5% of intended volume
-                if relative_error <= 0.05:
-                    accurate_transfers += 1
+        volumes = np.asarray(volume_pairs, dtype=np.float64).reshape(-1, 2)
+        intended, actual = volumes[:, 0], volumes[:, 1]
+        # Reuse one buffer for |intended - actual| / intended instead of a temporary per step
+        relative_error = np.subtract(intended, actual)
+        np.abs(relative_error, out=relative_error)
+        nonzero = intended != 0
+        np.divide(relative_error, intended, out=relative_error, where=nonzero)
+        # A zero intended volume has no relative error: exact if nothing was
+        # dispensed, otherwise scored as a 100% error
+        relative_error[~nonzero] = actual[~nonzero] != 0
         
+        # Consider transfer accurate if within 5% of intended volume
+        accurate_transfers = int(np.count_nonzero(relative_error <= 0.05))
         accuracy_rate = accurate_transfers / total_transfers if total_transfers > 0 else 0
-        avg_error = sum(volume_discrepancies) / len(volume_discrepancies) if volume_discrepancies else 0
+        avg_error = float(relative_error.mean()) if relative_error.size else 0
         
         return {
             "total_transfers": total_transfers,
@@ -147,16 +231,20 @@ class LabVideoAnalyzer:
             "quality_grade": self._get_quality_grade(accuracy_rate)
         }
     
-    def _get_quality_grade(self, accuracy_rate: float) -> str:
+    def find_tip_changes_needed(self) -> List[Dict[str, Any]]:
+        """Identify when tip changes should have occurred"""
+        _, tip_usage = self._scan_transfers()
+        return self._pipette_tip_events() + self._tip_change_events(tip_usage)
+    
+    def analyze_pipetting_accuracy(self) -> Dict[str, Any]:
+        """Analyze overall pipetting accuracy across the experiment"""
+        volume_pairs, _ = self._scan_transfers()
+        return self._accuracy_metrics(volume_pairs)
+    
+    @staticmethod
+    def _get_quality_grade(accuracy_rate: float) -> str:
         """Convert accuracy rate to quality grade"""
-        if accuracy_rate >= 0.95:
-            return "Excellent"
-        elif accuracy_rate >= 0.90:
-            return "Good"
-        elif accuracy_rate >= 0.80:
-            return "Fair"
-        else:
-            return "Poor"
+        return _GRADES[bisect_right(_GRADE_THRESHOLDS, accuracy_rate)]
     
     def find_protocol_deviations(self) -> List[Dict[str, Any]]:
         """Find deviations from expected protocol"""
@@ -185,8 +273,38 @@ class LabVideoAnalyzer:
         
         return deviations
     
+    def _compute_aggregates(self) -> Dict[str, Any]:
+        """Everything the report needs, with one pass over each experiment collection.
+
+        The result is cached until ExperimentState.version (or a collection
+        length) changes and is shared between reports, so callers must not
+        mutate it.
+        """
+        experiment = self.experiment
+        key = (
+            experiment.version,
+            len(experiment.all_transfers),
+            len(experiment.contamination_warnings),
+            len(experiment.volume_discrepancies)
+        )
+        if self._aggregates is None or self._aggregates_key != key:
+            volume_pairs, tip_usage = self._scan_transfers()
+            # Critical ranks above medium, so its count comes from the same filtered list
+            contamination_events = self.find_contamination_events(WarningSeverity.MEDIUM)
+            critical = WarningSeverity.CRITICAL
+            self._aggregates = {
+                "quality_metrics": self._accuracy_metrics(volume_pairs),
+                "tip_changes": self._tip_change_events(tip_usage),
+                "protocol_deviations": self.find_protocol_deviations(),
+                "contamination_events": contamination_events,
+                "critical_warnings": sum(1 for w in contamination_events if w.severity is critical)
+            }
+            self._aggregates_key = key
+        return self._aggregates
+    
     def generate_experiment_report(self) -> Dict[str, Any]:
         """Generate comprehensive experiment analysis report"""
+        aggregates = self._compute_aggregates()
         return {
             "experiment_id": self.experiment.experiment_id,
             "analysis_timestamp": datetime.now().isoformat(),
@@ -196,27 +314,49 @@ class LabVideoAnalyzer:
                 "wells_completed": self.experiment.wells_completed,
                 "total_wells": self.experiment.total_wells
             },
-            "quality_metrics": self.analyze_pipetting_accuracy(),
+            "quality_metrics": aggregates["quality_metrics"],
             "contamination_analysis": {
                 "risk_level": self.experiment.contamination_risk_level.value,
                 "total_warnings": len(self.experiment.contamination_warnings),
-                "critical_warnings": self.experiment.critical_warnings,
+                "critical_warnings": aggregates["critical_warnings"],
                 "contamination_events": [
                     {
-                        "type": w.warning_type.value,
-                        "severity": w.severity.value,
+                        "type": _WARNING_TYPE_VALUE[w.warning_type],
+                        "severity": _WARNING_SEVERITY_VALUE[w.severity],
                         "source": w.contamination_source,
                         "affected_containers": w.affected_containers
                     }
-                    for w in self.find_contamination_events(WarningSeverity.MEDIUM)
+                    for w in aggregates["contamination_events"]
                 ]
             },
-            "protocol_deviations": self.find_protocol_deviations(),
-            "tip_management": self.find_tip_changes_needed(),
+            "protocol_deviations": aggregates["protocol_deviations"],
+            # Pipette state is not versioned, so its tip check is always fresh
+            "tip_management": self._pipette_tip_events() + aggregates["tip_changes"],
             "hud_summary": self.experiment.get_hud_summary()
         }
 
 
+def _json_default(obj: Any) -> Any:
+    """Fallback for values neither serializer handles natively"""
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, ContaminationChain):
+        return list(obj)
+    return str(obj)
+
+
+def _dump_report(report: Dict[str, Any]) -> str:
+    """Pretty-print a report, through orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(report, default=_json_default, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(report, indent=2, default=_json_default)
+
+
+def _emit(*lines: str) -> None:
+    """Write a section's lines to stdout in a single call"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
 def create_sample_experiment() -> ExperimentState:
     """Create a sample experiment with realistic data for demonstration"""
     
@@ -250,10 +390,11 @@ def create_sample_experiment() -> ExperimentState:
         "Buffer L": Reagent(name="Buffer L", volume_ul=30.0, source_container="TUBE-L", color="clear")
     }
     
-    # Create realistic transfer sequence with some issues
+    # Create realistic transfer sequence with some issues. These are trusted
+    # literals, so model_construct skips validation (defaults still apply).
     transfers = [
         # Good transfers to A1
-        ReagentTransfer(
+        ReagentTransfer.model_construct(
             transfer_id=str(uuid.uuid4()),
             reagent=reagents["Reagent A"],
             source_container="TUBE-A",
@@ -266,7 +407,7 @@ def create_sample_experiment() -> ExperimentState:
         ),
         
         # Transfer to A2 without tip change (contamination issue)
-        ReagentTransfer(
+        ReagentTransfer.model_construct(
             transfer_id=str(uuid.uuid4()),
             reagent=reagents["Reagent B"],
             source_container="TUBE-B",
@@ -279,7 +420,7 @@ def create_sample_experiment() -> ExperimentState:
         ),
         
         # Continue with contaminated tip (more contamination)
-        ReagentTransfer(
+        ReagentTransfer.model_construct(
             transfer_id=str(uuid.uuid4()),
             reagent=reagents["Buffer L"],
             source_container="TUBE-L",
@@ -338,105 +479,120 @@ def create_sample_experiment() -> ExperimentState:
 def run_needle_in_haystack_demo():
     """Run comprehensive needle-in-haystack analysis demo"""
     
-    print("=" * 60)
-    print("NEEDLE IN THE HAYSTACK: Lab Video Analysis Demo")
-    print("=" * 60)
-    print()
+    _emit(
+        "=" * 60,
+        "NEEDLE IN THE HAYSTACK: Lab Video Analysis Demo",
+        "=" * 60,
+        "",
+    )
     
     # Create sample experiment
     experiment = create_sample_experiment()
     analyzer = LabVideoAnalyzer(experiment)
     
-    print("🔬 Experiment Created:")
-    print(f"   ID: {experiment.experiment_id}")
-    print(f"   Total Transfers: {len(experiment.all_transfers)}")
-    print(f"   Wells: {list(experiment.wells.keys())}")
-    print(f"   Warnings: {len(experiment.contamination_warnings)}")
-    print()
+    _emit(
+        "🔬 Experiment Created:",
+        f"   ID: {experiment.experiment_id}",
+        f"   Total Transfers: {len(experiment.all_transfers)}",
+        f"   Wells: {list(experiment.wells.keys())}",
+        f"   Warnings: {len(experiment.contamination_warnings)}",
+        "",
+    )
     
     # 1. Find contamination events
-    print("🚨 CONTAMINATION ANALYSIS:")
+    lines = ["🚨 CONTAMINATION ANALYSIS:"]
     contamination_events = analyzer.find_contamination_events(WarningSeverity.MEDIUM)
     for event in contamination_events:
-        print(f"   • {event.warning_type.value.title()} ({event.severity.value})")
-        print(f"     Source: {event.contamination_source}")
-        print(f"     Affected: {', '.join(event.affected_containers)}")
-        print(f"     Action: {event.recommended_action}")
-        print()
+        lines.append(f"   • {event.warning_type.value.title()} ({event.severity.value})")
+        lines.append(f"     Source: {event.contamination_source}")
+        lines.append(f"     Affected: {', '.join(event.affected_containers)}")
+        lines.append(f"     Action: {event.recommended_action}")
+        lines.append("")
+    _emit(*lines)
     
     # 2. Cross-contamination chain analysis
-    print("🔗 CROSS-CONTAMINATION CHAIN ANALYSIS:")
+    lines = ["🔗 CROSS-CONTAMINATION CHAIN ANALYSIS:"]
     for reagent_name in ["Reagent A", "Reagent B", "Buffer L"]:
         chain = analyzer.find_cross_contamination_chain(reagent_name)
         if chain["contamination_chain"]:
-            print(f"   • {reagent_name} ({chain['risk_level']} risk):")
-            print(f"     Contaminated wells: {chain['potentially_contaminated_wells']}")
+            lines.append(f"   • {reagent_name} ({chain['risk_level']} risk):")
+            lines.append(f"     Contaminated wells: {chain['potentially_contaminated_wells']}")
             for event in chain["contamination_chain"]:
-                print(f"     → {event['destination']}: {event['contamination_before']} → {event['contamination_after']}")
-            print()
+                lines.append(f"     → {event['destination']}: {event['contamination_before']} → {event['contamination_after']}")
+            lines.append("")
+    _emit(*lines)
     
     # 3. Tip management analysis
-    print("💡 TIP MANAGEMENT ANALYSIS:")
+    lines = ["💡 TIP MANAGEMENT ANALYSIS:"]
     tip_changes = analyzer.find_tip_changes_needed()
     for tip_issue in tip_changes:
-        print(f"   • Tip Issue: {tip_issue.get('tip_id', 'Current tip')}")
+        lines.append(f"   • Tip Issue: {tip_issue.get('tip_id', 'Current tip')}")
         if 'reagents_contacted' in tip_issue:
-            print(f"     Reagents contacted: {tip_issue['reagents_contacted']}")
-        print(f"     Recommendation: {tip_issue['recommendation']}")
-        print()
+            lines.append(f"     Reagents contacted: {tip_issue['reagents_contacted']}")
+        lines.append(f"     Recommendation: {tip_issue['recommendation']}")
+        lines.append("")
+    _emit(*lines)
     
     # 4. Volume accuracy analysis
-    print("📊 PIPETTING ACCURACY ANALYSIS:")
     accuracy = analyzer.analyze_pipetting_accuracy()
-    print(f"   • Total transfers: {accuracy['total_transfers']}")
-    print(f"   • Accurate transfers: {accuracy['accurate_transfers']}")
-    print(f"   • Accuracy rate: {accuracy['accuracy_rate']:.1%}")
-    print(f"   • Average error: {accuracy['average_volume_error']:.1%}")
-    print(f"   • Quality grade: {accuracy['quality_grade']}")
-    print()
+    _emit(
+        "📊 PIPETTING ACCURACY ANALYSIS:",
+        f"   • Total transfers: {accuracy['total_transfers']}",
+        f"   • Accurate transfers: {accuracy['accurate_transfers']}",
+        f"   • Accuracy rate: {accuracy['accuracy_rate']:.1%}",
+        f"   • Average error: {accuracy['average_volume_error']:.1%}",
+        f"   • Quality grade: {accuracy['quality_grade']}",
+        "",
+    )
     
     # 5. Protocol deviations
-    print("⚠️  PROTOCOL DEVIATIONS:")
+    lines = ["⚠️  PROTOCOL DEVIATIONS:"]
     deviations = analyzer.find_protocol_deviations()
     for deviation in deviations:
-        print(f"   • {deviation['type'].title()}: {deviation.get('well_id', deviation.get('container'))}")
+        lines.append(f"   • {deviation['type'].title()}: {deviation.get('well_id', deviation.get('container'))}")
         if 'expected_volume' in deviation:
-            print(f"     Expected: {deviation['expected_volume']}µl, Got: {deviation['actual_volume']}µl")
+            lines.append(f"     Expected: {deviation['expected_volume']}µl, Got: {deviation['actual_volume']}µl")
         if 'relative_error' in deviation:
-            print(f"     Error: {deviation['relative_error']:.1f}%")
-        print()
+            lines.append(f"     Error: {deviation['relative_error']:.1f}%")
+        lines.append("")
+    _emit(*lines)
     
     # 6. Advanced queries
-    print("🔍 ADVANCED QUERIES:")
+    lines = ["🔍 ADVANCED QUERIES:"]
     
     # Find all Reagent A transfers
     reagent_a_transfers = analyzer.find_transfers_by_reagent("Reagent A")
-    print(f"   • Reagent A transfers: {len(reagent_a_transfers)}")
+    lines.append(f"   • Reagent A transfers: {len(reagent_a_transfers)}")
     
     # Find volume discrepancies for A2
     a2_discrepancies = analyzer.find_volume_discrepancies_by_well("A2")
-    print(f"   • A2 volume discrepancies: {len(a2_discrepancies)}")
+    lines.append(f"   • A2 volume discrepancies: {len(a2_discrepancies)}")
     
     # Check HUD summary
     hud = experiment.get_hud_summary()
-    print(f"   • Current contamination risk: {hud['contamination_risk']}")
-    print(f"   • Active warnings: {hud['active_warnings']}")
-    print()
+    lines.append(f"   • Current contamination risk: {hud['contamination_risk']}")
+    lines.append(f"   • Active warnings: {hud['active_warnings']}")
+    lines.append("")
+    _emit(*lines)
     
     # 7. Generate comprehensive report
-    print("📋 GENERATING COMPREHENSIVE REPORT...")
+    _emit("📋 GENERATING COMPREHENSIVE REPORT...")
     report = analyzer.generate_experiment_report()
     
-    print("\n" + "=" * 60)
-    print("EXPERIMENT ANALYSIS REPORT")
-    print("=" * 60)
-    print(json.dumps(report, indent=2, default=str))
+    _emit(
+        "\n" + "=" * 60,
+        "EXPERIMENT ANALYSIS REPORT",
+        "=" * 60,
+        _dump_report(report),
+    )
     
-    print("\n" + "=" * 60)
-    print("DEMO COMPLETED!")
-    print("This demonstrates how the new models enable sophisticated")
-    print("'needle in the haystack' queries across entire video sessions.")
-    print("=" * 60)
+    _emit(
+        "\n" + "=" * 60,
+        "DEMO COMPLETED!",
+        "This demonstrates how the new models enable sophisticated",
+        "'needle in the haystack' queries across entire video sessions.",
+        "=" * 60,
+    )
 
 
 if __name__ == "__main__":
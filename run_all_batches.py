@@ -3,15 +3,31 @@
 Run all batches and then create the HTML viewer to see everything side by side
 """
 
+from pathlib import Path
+
 from video_understanding.batch_viewer import create_batch_viewer
 from video_understanding.tester import StatefulTester, process_all_batches
 
 
+def viewer_is_up_to_date(
+    cache_dir: str = "batch_cache", viewer_file: str = "batch_viewer.html"
+) -> bool:
+    """True when the viewer HTML is newer than everything in the batch cache"""
+    viewer = Path(viewer_file)
+    if not viewer.exists():
+        return False
+    cache_mtime = max(
+        (p.stat().st_mtime for p in Path(cache_dir).rglob("*")), default=0
+    )
+    return cache_mtime <= viewer.stat().st_mtime
+
+
 def main():
     # Configure your settings here
     images_folder = "videos/full_fps"  # UPDATE THIS PATH
     batch_size = 80
     start_batch = 0  # Start from beginning, or set to specific batch number
+    prefetch = True  # Read the next batch's images while the model runs; False for plain sequential debugging
 
     print("🚀 Starting batch processing...")
     print(f"Images folder: {images_folder}")
@@ -26,18 +42,21 @@ def main():
     # Process all batches
     print("\n📊 Processing all batches...")
     try:
-        process_all_batches(tester)
+        process_all_batches(tester, prefetch=prefetch)
         print("\n✅ All batches processed successfully!")
     except Exception as e:
         print(f"\n❌ Processing stopped at batch {tester.current_batch} due to error:")
         print(f"Error: {e}")
         print("\n📊 Creating viewer with batches processed so far...")
 
-    # Create the HTML viewer (even if some batches failed)
-    print("\n🎬 Creating batch viewer...")
-    create_batch_viewer()
+    # Create the HTML viewer (even if some batches failed), unless nothing changed
+    if viewer_is_up_to_date():
+        print("\n✅ Viewer up-to-date, batch cache unchanged since last build")
+    else:
+        print("\n🎬 Creating batch viewer...")
+        create_batch_viewer()
+        print("\n✅ Viewer created!")
 
-    print("\n✅ Viewer created!")
     print("📁 Files created:")
     print("  - batch_cache/ (contains all cached data and GIFs)")
     print("  - batch_viewer.html (open this in your browser)")
@@ -7,16 +7,18 @@ pipetting operations with complete state management.
 
 import uuid
 from datetime import datetime
-from video_understanding.models import (
-    PipetteState, PipetteAction, ContaminationLevel, 
-    Reagent, ReagentTransfer, ContaminationWarning, VolumeDiscrepancy,
-    WellContents, ExperimentState, WarningType, WarningSeverity,
-    TipContaminationHistory
-)
+
+# Script-only: nothing here is meant to be imported. The model imports live
+# inside each demo so importing this module (e.g. during test collection)
+# does not build the pydantic model graph.
+__all__: list[str] = []
 
 
 def demo_basic_usage():
     """Demonstrate basic usage of the new models"""
+    from video_understanding.models import (
+        PipetteState, ContaminationLevel, ExperimentState
+    )
     print("=== Basic Model Usage Demo ===\n")
     
     # Create an experiment
@@ -42,6 +44,9 @@ def demo_basic_usage():
 
 def demo_reagent_transfer():
     """Demonstrate reagent transfer tracking"""
+    from video_understanding.models import (
+        ContaminationLevel, Reagent, ReagentTransfer, ExperimentState
+    )
     print("=== Reagent Transfer Demo ===\n")
     
     # Create experiment
@@ -80,6 +85,9 @@ def demo_reagent_transfer():
 
 def demo_contamination_tracking():
     """Demonstrate contamination warning system"""
+    from video_understanding.models import (
+        Reagent, ContaminationWarning, ExperimentState, WarningType, WarningSeverity
+    )
     print("=== Contamination Tracking Demo ===\n")
     
     experiment = ExperimentState(experiment_id="EXP-003")
@@ -111,6 +119,7 @@ def demo_contamination_tracking():
 
 def demo_volume_discrepancy():
     """Demonstrate volume discrepancy tracking"""
+    from video_understanding.models import VolumeDiscrepancy, WarningSeverity
     print("=== Volume Discrepancy Demo ===\n")
     
     # Create volume discrepancy
@@ -139,6 +148,9 @@ def demo_volume_discrepancy():
 
 def demo_hud_overlay():
     """Demonstrate HUD overlay data generation"""
+    from video_understanding.models import (
+        PipetteState, PipetteAction, ContaminationLevel, Reagent, ReagentTransfer, ExperimentState
+    )
     print("=== HUD Overlay Demo ===\n")
     
     # Create a complete experiment scenario
@@ -180,6 +192,9 @@ def demo_hud_overlay():
 
 def demo_tip_contamination_history():
     """Demonstrate tip contamination history tracking"""
+    from video_understanding.models import (
+        PipetteState, ContaminationLevel, Reagent, TipContaminationHistory
+    )
     print("=== Tip Contamination History Demo ===\n")
     
     pipette = PipetteState(
@@ -218,6 +233,7 @@ def demo_tip_contamination_history():
 
 def demo_well_completion_tracking():
     """Demonstrate well completion tracking"""
+    from video_understanding.models import Reagent, ReagentTransfer, WellContents
     print("=== Well Completion Tracking Demo ===\n")
     
     # Create a well with expected volume
@@ -4,17 +4,26 @@ Event Merger - Combines analysis, objective, and procedure JSON files into a sin
 Processes timestamps and creates a unified event stream for HUD overlay.
 """
 
-import json
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple, Union, Any
+from typing import Callable, Dict, List, Tuple, Union, Any
 from dataclasses import dataclass
 
-# Add parent directory to path to import BaseModels
-sys.path.append(str(Path(__file__).parent.parent))
+import numpy as np
+
+try:
+    from numba import njit, prange  # optional: compiles the bulk timestamp conversion
+except ImportError:
+    njit = None
+
+# Add parent directory to path to import BaseModels (once)
+_PROJECT_ROOT = str(Path(__file__).parent.parent)
+if _PROJECT_ROOT not in sys.path:
+    sys.path.append(_PROJECT_ROOT)
 
 from video_understanding.simple_models import (
-    ProcedureExtraction,
     ObjectiveEventsList,
     AnalysisEventsResult,
     PipetteSettingChange,
@@ -24,8 +33,14 @@ from video_understanding.simple_models import (
     WarningEvent,
     WellStateEvent
 )
+from video_processing.json_to_models import (
+    dumps_json,
+    load_analysis_events_from_json,
+    load_objective_events_from_json,
+    load_procedure_from_json
+)
 
-@dataclass
+@dataclass(slots=True)
 class TimelineEvent:
     """Unified event for timeline display"""
     start_time: float  # seconds from video start
@@ -37,118 +52,238 @@ class TimelineEvent:
     event_model: Union[PipetteSettingChange, AspirationEvent, DispensingEvent, TipChangeEvent, WarningEvent, WellStateEvent]  # Typed event model
 
 
+# Event type and priority tags shared by every TimelineEvent (constant strings are
+# interned, so comparisons between them short-circuit on identity)
+_T_WARNING = sys.intern("warning")
+_T_WELL_STATE = sys.intern("well_state")
+_T_PIPETTE_SETTING = sys.intern("pipette_setting")
+_T_ASPIRATION = sys.intern("aspiration")
+_T_DISPENSING = sys.intern("dispensing")
+_T_TIP_CHANGE = sys.intern("tip_change")
+_P_HIGH = sys.intern("high")
+_P_MEDIUM = sys.intern("medium")
+_P_LOW = sys.intern("low")
+
+# "[H:]M:SS", optionally followed by " - [H:]M:SS"
+_TIMESTAMP_RANGE_RE = re.compile(r"\s*(?:(\d+):)?(\d+):(\d+)(?:\s*-\s*(?:(\d+):)?(\d+):(\d+))?\s*")
+
+
+def _range_fields(timestamp_str: str) -> Tuple[int, int, int, int, int, int]:
+    """(start h, m, s, end h, m, s) from '0:14 - 0:16' or a single '0:14'"""
+    match = _TIMESTAMP_RANGE_RE.fullmatch(timestamp_str)
+    if match is None:
+        raise ValueError(f"Invalid timestamp range: {timestamp_str}")
+    start_h, start_m, start_s, end_h, end_m, end_s = match.groups()
+    start_h = int(start_h) if start_h else 0
+    start_m, start_s = int(start_m), int(start_s)
+    if end_m is None:
+        # Single timestamps get a 1 second duration
+        return start_h, start_m, start_s, start_h, start_m, start_s + 1
+    return start_h, start_m, start_s, int(end_h) if end_h else 0, int(end_m), int(end_s)
+
+
+def clock_to_seconds(hours: np.ndarray, minutes: np.ndarray, seconds: np.ndarray) -> np.ndarray:
+    """Total seconds for parallel int64 arrays of clock fields"""
+    return hours * 3600 + minutes * 60 + seconds
+
+if njit is not None:
+    @njit(cache=True, parallel=True)
+    def clock_to_seconds(hours, minutes, seconds):
+        """Total seconds for parallel int64 arrays of clock fields"""
+        out = np.empty(minutes.shape[0], dtype=np.int64)
+        for i in prange(minutes.shape[0]):
+            out[i] = hours[i] * 3600 + minutes[i] * 60 + seconds[i]
+        return out
+
+
+def parse_timestamp_ranges(timestamp_strs: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """parse_timestamp_range for many strings: (start seconds, end seconds) arrays"""
+    fields = []
+    for timestamp_str in timestamp_strs:
+        fields.extend(_range_fields(timestamp_str))
+    
+    columns = np.array(fields, dtype=np.int64).reshape(-1, 6)
+    starts = clock_to_seconds(columns[:, 0].copy(), columns[:, 1].copy(), columns[:, 2].copy())
+    ends = clock_to_seconds(columns[:, 3].copy(), columns[:, 4].copy(), columns[:, 5].copy())
+    return starts, ends
+
+
 def parse_timestamp_range(timestamp_str: str) -> Tuple[float, float]:
     """Parse timestamp range string like '0:14 - 0:16' into start/end seconds"""
-    # Handle single timestamps like '0:14' 
-    if ' - ' not in timestamp_str:
-        time_parts = timestamp_str.split(':')
-        if len(time_parts) == 2:
-            minutes, seconds = map(int, time_parts)
-            total_seconds = minutes * 60 + seconds
-            return total_seconds, total_seconds + 1  # Add 1 second duration
-    
-    # Handle ranges like '0:14 - 0:16'
-    start_str, end_str = timestamp_str.split(' - ')
+    start_h, start_m, start_s, end_h, end_m, end_s = _range_fields(timestamp_str)
+    return start_h * 3600 + start_m * 60 + start_s, end_h * 3600 + end_m * 60 + end_s
+
+
+def _warning_timeline_event(event: WarningEvent, start_time: float, end_time: float) -> TimelineEvent:
+    return TimelineEvent(
+        start_time=start_time,
+        end_time=end_time,
+        event_type=_T_WARNING,
+        title=event.warning_message,
+        description=event.description,
+        priority=_P_HIGH,
+        event_model=event
+    )
+
+
+def _well_state_timeline_event(event: WellStateEvent, start_time: float, end_time: float) -> TimelineEvent:
+    status = "Complete" if event.is_complete else "Partial"
+    reagents = [r.name for r in event.current_contents]
+    return TimelineEvent(
+        start_time=start_time,
+        end_time=end_time,
+        event_type=_T_WELL_STATE,
+        title=f"Well {event.well_id}: {status}",
+        description=f"Contains: {', '.join(reagents)}",
+        priority=_P_MEDIUM,
+        event_model=event
+    )
+
+
+def _pipette_setting_timeline_event(event: PipetteSettingChange, start_time: float, end_time: float) -> TimelineEvent:
+    return TimelineEvent(
+        start_time=start_time,
+        end_time=end_time,
+        event_type=_T_PIPETTE_SETTING,
+        title=f"Set to {event.new_setting_ul}μL",
+        description=f"Pipette volume adjusted to {event.new_setting_ul} microliters",
+        priority=_P_LOW,
+        event_model=event
+    )
+
+
+def _aspiration_timeline_event(event: AspirationEvent, start_time: float, end_time: float) -> TimelineEvent:
+    return TimelineEvent(
+        start_time=start_time,
+        end_time=end_time,
+        event_type=_T_ASPIRATION,
+        title=f"Aspirate {event.reagent.name}",
+        description=f"Drew {event.reagent.volume_ul}μL of {event.reagent.name}",
+        priority=_P_MEDIUM,
+        event_model=event
+    )
+
+
+def _dispensing_timeline_event(event: DispensingEvent, start_time: float, end_time: float) -> TimelineEvent:
+    return TimelineEvent(
+        start_time=start_time,
+        end_time=end_time,
+        event_type=_T_DISPENSING,
+        title=f"Dispense {event.reagent.name}",
+        description=f"Added {event.reagent.volume_ul}μL of {event.reagent.name}",
+        priority=_P_MEDIUM,
+        event_model=event
+    )
+
+
+def _tip_change_timeline_event(event: TipChangeEvent, start_time: float, end_time: float) -> TimelineEvent:
+    return TimelineEvent(
+        start_time=start_time,
+        end_time=end_time,
+        event_type=_T_TIP_CHANGE,
+        title="Tip Change",
+        description="Pipette tip attached/removed",
+        priority=_P_LOW,
+        event_model=event
+    )
+
+
+# Timeline builders keyed by exact event class; events of other types are skipped
+_ANALYSIS_HANDLERS: Dict[type, Callable[[Any, float, float], TimelineEvent]] = {
+    WarningEvent: _warning_timeline_event,
+    WellStateEvent: _well_state_timeline_event,
+}
+
+_OBJECTIVE_HANDLERS: Dict[type, Callable[[Any, float, float], TimelineEvent]] = {
+    PipetteSettingChange: _pipette_setting_timeline_event,
+    AspirationEvent: _aspiration_timeline_event,
+    DispensingEvent: _dispensing_timeline_event,
+    TipChangeEvent: _tip_change_timeline_event,
+}
+
+# Serialized "event_model_type" for every class a handler can produce
+_EVENT_MODEL_TYPE_NAMES = {cls: cls.__name__ for cls in (*_ANALYSIS_HANDLERS, *_OBJECTIVE_HANDLERS)}
+
+
+def _build_timeline_events(events, handlers) -> List[TimelineEvent]:
+    handled = []
+    append = handled.append
+    get_handler = handlers.get
     
-    def time_to_seconds(time_str: str) -> float:
-        parts = time_str.split(':')
-        if len(parts) == 2:
-            minutes, seconds = map(int, parts)
-            return minutes * 60 + seconds
-        elif len(parts) == 3:
-            hours, minutes, seconds = map(int, parts)
-            return hours * 3600 + minutes * 60 + seconds
-        else:
-            raise ValueError(f"Invalid time format: {time_str}")
+    for event in events:
+        handler = get_handler(type(event))
+        if handler is not None:
+            append((handler, event))
     
-    return time_to_seconds(start_str), time_to_seconds(end_str)
+    # Convert all timestamps in one bulk call, then build the events
+    start_times, end_times = parse_timestamp_ranges([event.timestamp_range for _, event in handled])
+    return [
+        handler(event, start_time, end_time)
+        for (handler, event), start_time, end_time in zip(handled, start_times.tolist(), end_times.tolist())
+    ]
 
 
 def process_analysis_events(analysis_events: AnalysisEventsResult) -> List[TimelineEvent]:
     """Convert analysis events to timeline events using BaseModel instances"""
-    events = []
-    
-    for event in analysis_events.events:
-        start_time, end_time = parse_timestamp_range(event.timestamp_range)
-        
-        if isinstance(event, WarningEvent):
-            events.append(TimelineEvent(
-                start_time=start_time,
-                end_time=end_time,
-                event_type="warning",
-                title=event.warning_message,
-                description=event.description,
-                priority="high",
-                event_model=event
-            ))
-        elif isinstance(event, WellStateEvent):
-            status = "Complete" if event.is_complete else "Partial"
-            reagents = [r.name for r in event.current_contents]
-            title = f"Well {event.well_id}: {status}"
-            description = f"Contains: {', '.join(reagents)}"
-            
-            events.append(TimelineEvent(
-                start_time=start_time,
-                end_time=end_time,
-                event_type="well_state",
-                title=title,
-                description=description,
-                priority="medium",
-                event_model=event
-            ))
-    
-    return events
+    return _build_timeline_events(analysis_events.events, _ANALYSIS_HANDLERS)
 
 
 def process_objective_events(objective_events: ObjectiveEventsList) -> List[TimelineEvent]:
     """Convert objective events to timeline events using BaseModel instances"""
-    events = []
-    
-    for event in objective_events.events:
-        start_time, end_time = parse_timestamp_range(event.timestamp_range)
+    return _build_timeline_events(objective_events.events, _OBJECTIVE_HANDLERS)
+
+
+# Field order of each serialized timeline entry; rows from _timeline_row line up with it
+_TIMELINE_KEYS = (
+    "start_time",
+    "end_time",
+    "event_type",
+    "title",
+    "description",
+    "priority",
+    "event_model",
+    "event_model_type"
+)
+
+
+def _timeline_row(event: TimelineEvent) -> Tuple[Any, ...]:
+    event_model = event.event_model
+    model_cls = type(event_model)
+    return (
+        event.start_time,
+        event.end_time,
+        event.event_type,
+        event.title,
+        event.description,
+        event.priority,
+        model_cls.model_dump(event_model),
+        _EVENT_MODEL_TYPE_NAMES[model_cls]
+    )
+
+
+def write_timeline_file(
+    output_file: str,
+    procedure_context: Dict[str, Any],
+    timeline_events: List[TimelineEvent]
+) -> None:
+    """Stream the merged timeline to disk without building the whole document first.
+
+    Each entry is serialized and written on its own; nested lines are
+    re-indented so the file matches a single indent=2 dump of
+    {"procedure_context", "total_events", "timeline"}.
+    """
+    with open(output_file, 'wb') as f:
+        f.write(b'{\n  "procedure_context": ')
+        f.write(dumps_json(procedure_context).replace(b'\n', b'\n  '))
+        f.write(b',\n  "total_events": %d,\n  "timeline": [' % len(timeline_events))
         
-        if isinstance(event, PipetteSettingChange):
-            events.append(TimelineEvent(
-                start_time=start_time,
-                end_time=end_time,
-                event_type="pipette_setting",
-                title=f"Set to {event.new_setting_ul}μL",
-                description=f"Pipette volume adjusted to {event.new_setting_ul} microliters",
-                priority="low",
-                event_model=event
-            ))
-        elif isinstance(event, AspirationEvent):
-            events.append(TimelineEvent(
-                start_time=start_time,
-                end_time=end_time,
-                event_type="aspiration",
-                title=f"Aspirate {event.reagent.name}",
-                description=f"Drew {event.reagent.volume_ul}μL of {event.reagent.name}",
-                priority="medium",
-                event_model=event
-            ))
-        elif isinstance(event, DispensingEvent):
-            events.append(TimelineEvent(
-                start_time=start_time,
-                end_time=end_time,
-                event_type="dispensing",
-                title=f"Dispense {event.reagent.name}",
-                description=f"Added {event.reagent.volume_ul}μL of {event.reagent.name}",
-                priority="medium",
-                event_model=event
-            ))
-        elif isinstance(event, TipChangeEvent):
-            events.append(TimelineEvent(
-                start_time=start_time,
-                end_time=end_time,
-                event_type="tip_change",
-                title="Tip Change",
-                description="Pipette tip attached/removed",
-                priority="low",
-                event_model=event
-            ))
-    
-    return events
+        separator = b'\n    '
+        for event in timeline_events:
+            f.write(separator)
+            f.write(dumps_json(dict(zip(_TIMELINE_KEYS, _timeline_row(event)))).replace(b'\n', b'\n    '))
+            separator = b',\n    '
+        
+        f.write(b'\n  ]\n}' if timeline_events else b']\n}')
 
 
 def merge_events_to_timeline(
@@ -159,81 +294,31 @@ def merge_events_to_timeline(
 ) -> None:
     """Merge all event files into a single timeline JSON using BaseModel validation"""
     
-    # Load and validate JSON files using BaseModels
-    with open(analysis_file, 'r') as f:
-        analysis_data = json.load(f)
-    
-    # Parse individual analysis events based on their structure
-    parsed_analysis_events = []
-    for event_data in analysis_data.get("events", []):
-        if "warning_message" in event_data:
-            parsed_analysis_events.append(WarningEvent(**event_data))
-        elif "well_id" in event_data:
-            parsed_analysis_events.append(WellStateEvent(**event_data))
-    
-    analysis_events = AnalysisEventsResult(
-        thinking=analysis_data.get("thinking", "Analysis events extracted from video"),
-        events=parsed_analysis_events
-    )
-    
-    with open(objective_file, 'r') as f:
-        objective_data = json.load(f)
-    
-    # Parse individual objective events based on their structure
-    parsed_objective_events = []
-    for event_data in objective_data.get("events", []):
-        if "new_setting_ul" in event_data:
-            parsed_objective_events.append(PipetteSettingChange(**event_data))
-        elif "reagent" in event_data:
-            # Determine if aspiration or dispensing based on thinking content
-            thinking = event_data.get("thinking", "").lower()
-            if "aspiration" in thinking or "aspirate" in thinking:
-                parsed_objective_events.append(AspirationEvent(**event_data))
-            else:
-                parsed_objective_events.append(DispensingEvent(**event_data))
-        else:
-            # Tip change event
-            parsed_objective_events.append(TipChangeEvent(**event_data))
-    
-    objective_events = ObjectiveEventsList(
-        thinking=objective_data.get("thinking", "Objective events extracted from video"),
-        events=parsed_objective_events
-    )
-    
-    with open(procedure_file, 'r') as f:
-        procedure_data = json.load(f)
-    procedure = ProcedureExtraction(**procedure_data)
+    # Load and validate the three independent files concurrently using BaseModels
+    # (event arrays are streamed item by item when ijson is installed)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        analysis_future = executor.submit(load_analysis_events_from_json, analysis_file)
+        objective_future = executor.submit(load_objective_events_from_json, objective_file)
+        procedure_future = executor.submit(load_procedure_from_json, procedure_file)
+        analysis_events = analysis_future.result()
+        objective_events = objective_future.result()
+        procedure = procedure_future.result()
     
     # Process events using typed BaseModel instances
     timeline_events = []
     timeline_events.extend(process_analysis_events(analysis_events))
     timeline_events.extend(process_objective_events(objective_events))
     
-    # Sort by start time
-    timeline_events.sort(key=lambda x: x.start_time)
-    
-    # Convert to serializable format with typed event models
-    timeline_data = {
-        "procedure_context": procedure.model_dump(),
-        "total_events": len(timeline_events),
-        "timeline": [
-            {
-                "start_time": event.start_time,
-                "end_time": event.end_time,
-                "event_type": event.event_type,
-                "title": event.title,
-                "description": event.description,
-                "priority": event.priority,
-                "event_model": event.event_model.model_dump(),
-                "event_model_type": type(event.event_model).__name__
-            }
-            for event in timeline_events
-        ]
-    }
+    # Sort by start time with a stable argsort over the start-time column
+    # (ties keep analysis-then-objective order)
+    start_times = np.fromiter(
+        (event.start_time for event in timeline_events), dtype=np.float64, count=len(timeline_events)
+    )
+    order = np.argsort(start_times, kind="stable")
+    timeline_events = [timeline_events[i] for i in order.tolist()]
     
-    # Save merged timeline
-    with open(output_file, 'w') as f:
-        json.dump(timeline_data, f, indent=2)
+    # Save merged timeline, serializing typed event models one entry at a time
+    write_timeline_file(output_file, procedure.model_dump(), timeline_events)
     
     print(f"Merged {len(timeline_events)} events into timeline: {output_file}")
     
@@ -6,71 +6,217 @@ This allows for better type checking and validation of the event data.
 
 import json
 import sys
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, get_args, get_origin
 
-# Add the parent directory to the path to import from video_understanding
-sys.path.append(str(Path(__file__).parent.parent))
+# Add the parent directory to the path to import from video_understanding (once)
+_PROJECT_ROOT = str(Path(__file__).parent.parent)
+if _PROJECT_ROOT not in sys.path:
+    sys.path.append(_PROJECT_ROOT)
+
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson  # optional: native JSON parser/serializer
+except ImportError:
+    orjson = None
+
+try:
+    import ijson  # optional: streams large event arrays item by item
+except ImportError:
+    ijson = None
 
 from video_understanding.simple_models import (
     ProcedureExtraction,
     ObjectiveEventsList,
     AnalysisEventsResult,
+    ObjectiveEvent,
+    AnalysisEvent,
     PipetteSettingChange,
     AspirationEvent,
     DispensingEvent,
     TipChangeEvent,
     WarningEvent,
-    WellStateEvent
+    WellStateEvent,
+    analysis_event_kind,
+    objective_event_kind
 )
 
 
-def load_procedure_from_json(json_path: str) -> ProcedureExtraction:
-    """Load and validate procedure extraction from JSON"""
+# Discriminator tag -> event class, for building trusted events without validation
+_OBJECTIVE_EVENT_CLASSES = {
+    "pipette_setting": PipetteSettingChange,
+    "aspiration": AspirationEvent,
+    "dispensing": DispensingEvent,
+    "tip_change": TipChangeEvent,
+}
+_ANALYSIS_EVENT_CLASSES = {
+    "warning": WarningEvent,
+    "well_state": WellStateEvent,
+}
+
+
+def read_json_file(json_path: str) -> Any:
+    """Load a JSON file, through orjson when it is installed"""
+    if orjson is not None:
+        with open(json_path, 'rb') as f:
+            return orjson.loads(f.read())
     with open(json_path, 'r') as f:
-        data = json.load(f)
+        return json.load(f)
+
+
+def dumps_json(data: Any) -> bytes:
+    """Serialize data as indented JSON bytes, through orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode()
+
+
+def write_json_file(json_path: str, data: Any) -> None:
+    """Write data as indented JSON"""
+    with open(json_path, 'wb') as f:
+        f.write(dumps_json(data))
+
+
+@lru_cache(maxsize=None)
+def _nested_model_fields(model_cls: type) -> Tuple[Tuple[str, type, bool], ...]:
+    """(name, model class, is_list) for each field holding a model or a list of models"""
+    nested = []
+    for name, field in model_cls.model_fields.items():
+        annotation, is_list = field.annotation, False
+        if get_origin(annotation) is list:
+            annotation, is_list = get_args(annotation)[0], True
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            nested.append((name, annotation, is_list))
+    return tuple(nested)
+
+
+def construct_trusted(model_cls: type, data: Dict[str, Any]) -> BaseModel:
+    """model_construct that also builds nested models; skips all validation"""
+    values = dict(data)
+    for name, nested_cls, is_list in _nested_model_fields(model_cls):
+        value = values.get(name)
+        if value is None:
+            continue
+        if is_list:
+            values[name] = [construct_trusted(nested_cls, item) for item in value]
+        else:
+            values[name] = construct_trusted(nested_cls, value)
+    return model_cls.model_construct(**values)
+
+
+# Each adapter validates a whole raw event list in a single pydantic-core call. They
+# are built on first use so importing this module for its helpers stays cheap.
+@lru_cache(maxsize=None)
+def _objective_events_adapter() -> TypeAdapter:
+    return TypeAdapter(List[ObjectiveEvent])
+
+
+@lru_cache(maxsize=None)
+def _analysis_events_adapter() -> TypeAdapter:
+    return TypeAdapter(List[AnalysisEvent])
+
+
+@lru_cache(maxsize=None)
+def _objective_event_adapter() -> TypeAdapter:
+    return TypeAdapter(ObjectiveEvent)
+
+
+@lru_cache(maxsize=None)
+def _analysis_event_adapter() -> TypeAdapter:
+    return TypeAdapter(AnalysisEvent)
+
+
+def _validate_analysis_event(event_data: Dict[str, Any]) -> Optional[AnalysisEvent]:
+    if analysis_event_kind(event_data) is None:
+        return None
+    return _analysis_event_adapter().validate_python(event_data)
+
+
+def _stream_events(
+    json_path: str,
+    validate_event: Callable[[Dict[str, Any]], Any],
+    default_thinking: str
+) -> Tuple[str, List[Any]]:
+    """(thinking, events) with the events array validated one item at a time through ijson
+
+    Only one raw event dict is alive at a time; events validated to None are dropped.
+    """
+    with open(json_path, 'rb') as f:
+        raw_events = ijson.items(f, "events.item", use_float=True)
+        events = [event for event in map(validate_event, raw_events) if event is not None]
+    
+    # thinking is a single top-level string; this pass stops as soon as it is found
+    with open(json_path, 'rb') as f:
+        thinking = next(ijson.items(f, "thinking"), default_thinking)
     
-    return ProcedureExtraction(**data)
+    return thinking, events
 
 
-def load_objective_events_from_json(json_path: str) -> ObjectiveEventsList:
-    """Load and validate objective events from JSON"""
-    with open(json_path, 'r') as f:
-        data = json.load(f)
+def parse_objective_events(events_data: List[Dict[str, Any]]) -> List[ObjectiveEvent]:
+    """Validate raw objective event dicts into their event models"""
+    return _objective_events_adapter().validate_python(events_data)
+
+
+def parse_analysis_events(events_data: List[Dict[str, Any]]) -> List[AnalysisEvent]:
+    """Validate raw analysis event dicts, dropping ones that are neither warnings nor well states"""
+    known = [event_data for event_data in events_data if analysis_event_kind(event_data) is not None]
+    return _analysis_events_adapter().validate_python(known)
+
+
+def load_procedure_from_json(json_path: str, trusted: bool = False) -> ProcedureExtraction:
+    """Load and validate procedure extraction from JSON
+
+    With trusted=True the data (e.g. a file this module already validated)
+    is loaded without validation.
+    """
+    data = read_json_file(json_path)
     
-    # Parse individual events based on their structure
-    parsed_events = []
-    for event_data in data.get("events", []):
-        if "new_setting_ul" in event_data:
-            parsed_events.append(PipetteSettingChange(**event_data))
-        elif "reagent" in event_data:
-            # Check if it's aspiration or dispensing based on thinking content
-            thinking = event_data.get("thinking", "").lower()
-            if "aspiration" in thinking or "aspirate" in thinking:
-                parsed_events.append(AspirationEvent(**event_data))
-            else:
-                parsed_events.append(DispensingEvent(**event_data))
-        else:
-            # Tip change event
-            parsed_events.append(TipChangeEvent(**event_data))
+    if trusted:
+        return construct_trusted(ProcedureExtraction, data)
+    return ProcedureExtraction.model_validate(data)
+
+
+def load_objective_events_from_json(json_path: str, trusted: bool = False) -> ObjectiveEventsList:
+    """Load and validate objective events from JSON (trusted=True skips validation)"""
+    default_thinking = "Objective events extracted from video"
+    if ijson is not None and not trusted:
+        thinking, events = _stream_events(json_path, _objective_event_adapter().validate_python, default_thinking)
+        return ObjectiveEventsList(thinking=thinking, events=events)
+    
+    data = read_json_file(json_path)
+    thinking = data.get("thinking", default_thinking)
+    events_data = data.get("events", [])
     
-    return ObjectiveEventsList(events=parsed_events)
+    if trusted:
+        events = [
+            construct_trusted(_OBJECTIVE_EVENT_CLASSES[objective_event_kind(event_data)], event_data)
+            for event_data in events_data
+        ]
+        return ObjectiveEventsList.model_construct(thinking=thinking, events=events)
+    return ObjectiveEventsList(thinking=thinking, events=parse_objective_events(events_data))
 
 
-def load_analysis_events_from_json(json_path: str) -> AnalysisEventsResult:
-    """Load and validate analysis events from JSON"""
-    with open(json_path, 'r') as f:
-        data = json.load(f)
+def load_analysis_events_from_json(json_path: str, trusted: bool = False) -> AnalysisEventsResult:
+    """Load and validate analysis events from JSON (trusted=True skips validation)"""
+    default_thinking = "Analysis events extracted from video"
+    if ijson is not None and not trusted:
+        thinking, events = _stream_events(json_path, _validate_analysis_event, default_thinking)
+        return AnalysisEventsResult(thinking=thinking, events=events)
     
-    # Parse individual events based on their structure
-    parsed_events = []
-    for event_data in data.get("events", []):
-        if "warning_message" in event_data:
-            parsed_events.append(WarningEvent(**event_data))
-        elif "well_id" in event_data:
-            parsed_events.append(WellStateEvent(**event_data))
+    data = read_json_file(json_path)
+    thinking = data.get("thinking", default_thinking)
+    events_data = data.get("events", [])
     
-    return AnalysisEventsResult(events=parsed_events)
+    if trusted:
+        events = []
+        for event_data in events_data:
+            kind = analysis_event_kind(event_data)
+            if kind is not None:
+                events.append(construct_trusted(_ANALYSIS_EVENT_CLASSES[kind], event_data))
+        return AnalysisEventsResult.model_construct(thinking=thinking, events=events)
+    return AnalysisEventsResult(thinking=thinking, events=parse_analysis_events(events_data))
 
 
 def save_validated_models(
@@ -83,15 +229,10 @@ def save_validated_models(
     output_path = Path(output_dir)
     output_path.mkdir(exist_ok=True)
     
-    # Save as validated JSON files
-    with open(output_path / "validated_procedure.json", 'w') as f:
-        json.dump(procedure.model_dump(), f, indent=2)
-    
-    with open(output_path / "validated_objective_events.json", 'w') as f:
-        json.dump(objective_events.model_dump(), f, indent=2)
-    
-    with open(output_path / "validated_analysis_events.json", 'w') as f:
-        json.dump(analysis_events.model_dump(), f, indent=2)
+    # Save as validated JSON files, serialized by pydantic-core without a dict round trip
+    (output_path / "validated_procedure.json").write_text(procedure.model_dump_json(indent=2))
+    (output_path / "validated_objective_events.json").write_text(objective_events.model_dump_json(indent=2))
+    (output_path / "validated_analysis_events.json").write_text(analysis_events.model_dump_json(indent=2))
     
     print(f"Validated models saved to {output_path}")
 
@@ -9,9 +9,25 @@ HUD overlay for pipetting-video review.
 • **BIG WARNING PANEL** – fills ½ width × ½ height, centred, when WarningEvent active
 """
 
-import cv2, json, numpy as np, matplotlib.colors as mcolors
+import cv2, heapq, json, numpy as np, matplotlib.colors as mcolors
+from bisect import bisect_left
+from functools import lru_cache
 from pathlib import Path
+import os
+import queue
 import sys
+import tempfile
+import threading
+
+try:
+    import ffmpegcv  # optional: NVENC hardware encoding through an ffmpeg pipe
+except ImportError:
+    ffmpegcv = None
+
+try:
+    from numba import njit, prange  # optional: compiles the panel blend
+except ImportError:
+    njit = None
 
 sys.path.append(str(Path(__file__).parent.parent))
 
@@ -23,6 +39,7 @@ TIP_PANEL_ALPHA = 0.75
 POPUP_FONT_SCALE = 1.2
 BANNER_MAIN_SCALE = 2.8
 BANNER_DET_SCALE = 1.8
+WRITE_QUEUE_SIZE = 8  # frames buffered between drawing and encoding
 
 STATE_COLOURS = {
     "empty": "white",
@@ -30,6 +47,10 @@ STATE_COLOURS = {
     "complete": "limegreen",
     "contaminated": "red",
 }
+STATE_BGR = {
+    name: tuple(int(c * 255) for c in mcolors.to_rgb(col))[::-1]
+    for name, col in STATE_COLOURS.items()
+}
 
 EVENT_PRIORITY = {
     "warning": 4,
@@ -45,10 +66,17 @@ EVENT_PRIORITY = {
 class PlateMap3:
     def __init__(self, goal):
         self.wells = [w["well_id"] for w in goal]
-        self.goal = {w["well_id"]: {r["name"] for r in w["reagents"]} for w in goal}
-        self.missing = {w: set(self.goal[w]) for w in self.wells}
+        # reagent sets as int bitmasks, one bit per goal reagent
+        names = dict.fromkeys(r["name"] for w in goal for r in w["reagents"])
+        self._bits = {name: 1 << i for i, name in enumerate(names)}
+        self.goal_mask = {w["well_id"]: 0 for w in goal}
+        for w in goal:
+            for r in w["reagents"]:
+                self.goal_mask[w["well_id"]] |= self._bits[r["name"]]
+        self.missing_mask = dict(self.goal_mask)
         self.contaminated = {w: False for w in self.wells}
         self.contam_time = {}
+        self._sprites = {}
 
     def record_contamination(self, reagent, t):
         self.contam_time.setdefault(reagent, t)
@@ -58,32 +86,51 @@ class PlateMap3:
             return
         if reagent in self.contam_time and t >= self.contam_time[reagent]:
             self.contaminated[wid] = True
-        self.missing[wid].discard(reagent)
+        self.missing_mask[wid] &= ~self._bits.get(reagent, 0)
 
     def state(self, wid):
         if self.contaminated[wid]:
             return "contaminated"
-        if not self.missing[wid]:
+        missing = self.missing_mask[wid]
+        if not missing:
             return "complete"
-        if self.missing[wid] != self.goal[wid]:
+        if missing != self.goal_mask[wid]:
             return "partial"
         return "empty"
 
+    def _sprite(self, states, x0, y0, w_inset, h_inset):
+        """Border + well circles for one state combination, and the mask of pixels drawn.
+
+        These are opaque, so they can be rendered once and copied onto every
+        frame; the anti-aliased labels blend with the video and are drawn live.
+        """
+        key = (states, x0, y0, w_inset, h_inset)
+        if key not in self._sprites:
+            ox, oy = x0 - 1, y0 - 1
+            sprite = np.zeros((h_inset + 3, w_inset + 3, 3), np.uint8)
+            mask = np.zeros((h_inset + 3, w_inset + 3), np.uint8)
+            for canvas, border in ((sprite, (200, 200, 200)), (mask, 255)):
+                cv2.rectangle(canvas, (0, 0), (w_inset + 2, h_inset + 2), border, 1)
+            spacing = w_inset / len(self.wells)
+            rad = int(min(spacing, h_inset) * 0.4)
+            for i, state in enumerate(states):
+                cx = int(x0 + spacing * (i + 0.5)) - ox
+                cy = int(y0 + h_inset / 2) - oy
+                cv2.circle(sprite, (cx, cy), rad, STATE_BGR[state], -1)
+                cv2.circle(mask, (cx, cy), rad, 255, -1)
+            self._sprites[key] = (sprite, mask.astype(bool)[:, :, None])
+        return self._sprites[key]
+
     def draw(self, frame, x0, y0, w_inset=PLATE_W, h_inset=PLATE_H):
-        cv2.rectangle(
-            frame,
-            (x0 - 1, y0 - 1),
-            (x0 + w_inset + 1, y0 + h_inset + 1),
-            (200, 200, 200),
-            1,
-        )
+        states = tuple(self.state(wid) for wid in self.wells)
+        sprite, mask = self._sprite(states, x0, y0, w_inset, h_inset)
+        roi = frame[y0 - 1 : y0 + h_inset + 2, x0 - 1 : x0 + w_inset + 2]
+        np.copyto(roi, sprite, where=mask)
         n, spacing = len(self.wells), w_inset / len(self.wells)
         rad = int(min(spacing, h_inset) * 0.4)
         for i, wid in enumerate(self.wells):
             cx = int(x0 + spacing * (i + 0.5))
             cy = int(y0 + h_inset / 2)
-            rgb = np.array(mcolors.to_rgb(STATE_COLOURS[self.state(wid)])) * 255
-            cv2.circle(frame, (cx, cy), rad, tuple(map(int, rgb[::-1])), -1)
             cv2.putText(
                 frame,
                 wid,
@@ -97,19 +144,66 @@ class PlateMap3:
 
 
 # ───────────────────────  DRAW HELPERS  ─────────────────────────
+_CLEAN_TBL = str.maketrans({"µ": "u", "μ": "u"})
+
+
+@lru_cache(maxsize=512)
 def _clean(t):
-    return t.replace("µ", "u").replace("μ", "u")
+    return t.translate(_CLEAN_TBL)
+
+
+@lru_cache(maxsize=4096)
+def _ts(t, s, k):
+    return cv2.getTextSize(t, cv2.FONT_HERSHEY_SIMPLEX, s, k)
+
+
+@lru_cache(maxsize=None)
+def _blend_lut(c, a):
+    """(3, 256) table: channel value -> value blended toward colour c with alpha a.
+
+    Built with addWeighted itself so the result matches a full-frame blend exactly.
+    """
+    px = np.arange(256, dtype=np.uint8)[None, :].repeat(3, axis=0)
+    solid = np.array(c, np.uint8)[:, None].repeat(256, axis=1)
+    return cv2.addWeighted(solid, a, px, 1 - a, 0)
+
+
+if njit is not None:
+    @njit(cache=True, parallel=True)
+    def _blend_rect(f, x1, y1, x2, y2, lut):
+        """Blend the inclusive box (x1, y1)-(x2, y2) of f in place through lut"""
+        for y in prange(y1, y2 + 1):
+            for x in range(x1, x2 + 1):
+                for ch in range(3):
+                    f[y, x, ch] = lut[ch, f[y, x, ch]]
+
+
+# (h, w, colour) -> solid panel of that size; panel sizes repeat across frames
+_solid_cache = {}
 
 
 def _rect(f, p1, p2, c, a=0.7):
-    o = f.copy()
-    cv2.rectangle(o, p1, p2, c, -1)
-    cv2.addWeighted(o, a, f, 1 - a, 0, f)
+    # only the filled box changes, so blend just that (clipped like cv2.rectangle)
+    x1, x2 = sorted((p1[0], p2[0]))
+    y1, y2 = sorted((p1[1], p2[1]))
+    x1, y1 = max(x1, 0), max(y1, 0)
+    x2, y2 = min(x2, f.shape[1] - 1), min(y2, f.shape[0] - 1)
+    if x1 > x2 or y1 > y2:
+        return
+    if njit is not None:
+        _blend_rect(f, x1, y1, x2, y2, _blend_lut(tuple(c), a))
+        return
+    roi = f[y1 : y2 + 1, x1 : x2 + 1]
+    key = (*roi.shape[:2], tuple(c))
+    solid = _solid_cache.get(key)
+    if solid is None:
+        solid = _solid_cache[key] = np.full_like(roi, c)
+    cv2.addWeighted(solid, a, roi, 1 - a, 0, roi)
 
 
 def banner_text(f, t, pos, s, col, k=2):
     t = _clean(t)
-    (tw, th), bl = cv2.getTextSize(t, cv2.FONT_HERSHEY_SIMPLEX, s, k)
+    (tw, th), bl = _ts(t, s, k)
     x, y = pos
     x -= tw // 2
     y -= th // 2
@@ -117,28 +211,40 @@ def banner_text(f, t, pos, s, col, k=2):
     cv2.putText(f, t, (x, y + th), cv2.FONT_HERSHEY_SIMPLEX, s, col, k, cv2.LINE_AA)
 
 
+# (text, w_max, scale) -> [(line, width), ...]; event text repeats every frame
+_wrap_cache = {}
+
+
+def _wrap_text(t, w_max, s):
+    key = (t, w_max, s)
+    wrapped = _wrap_cache.get(key)
+    if wrapped is None:
+        words = t.split()
+        lines = []
+        cur = ""
+        while words:
+            w = words.pop(0)
+            nxt = (cur + " " + w).strip()
+            if _ts(nxt, s, 2)[0][0] <= w_max:
+                cur = nxt
+            else:
+                lines.append(cur)
+                cur = w
+        if cur:
+            lines.append(cur)
+            lines = lines[:4]
+        wrapped = [(l, _ts(l, s, 2)[0][0]) for l in lines]
+        _wrap_cache[key] = wrapped
+    return wrapped
+
+
 def info_box(f, t, x, y, w_max, s):
-    t = _clean(t)
+    lines = _wrap_text(_clean(t), w_max, s)
     font = cv2.FONT_HERSHEY_SIMPLEX
-    words = t.split()
-    lines = []
-    cur = ""
-    while words:
-        w = words.pop(0)
-        nxt = (cur + " " + w).strip()
-        if cv2.getTextSize(nxt, font, s, 2)[0][0] <= w_max:
-            cur = nxt
-        else:
-            lines.append(cur)
-            cur = w
-    if cur:
-        lines.append(cur)
-        lines = lines[:4]
     lh = int(30 * s)
     h_box = lh * len(lines) + 20
     _rect(f, (x - 10, y - 10), (x + w_max + 10, y + h_box + 10), (0, 0, 0), 0.85)
-    for i, l in enumerate(lines):
-        l_w = cv2.getTextSize(l, font, s, 2)[0][0]
+    for i, (l, l_w) in enumerate(lines):
         cv2.putText(
             f,
             l,
@@ -151,6 +257,197 @@ def info_box(f, t, x, y, w_max, s):
         )
 
 
+# ───────────────────────  TIMELINE SWEEP  ──────────────────────
+class ActiveSweep:
+    """Which (start, end) intervals contain t, for non-decreasing t.
+
+    Items are (start, end, key, value) with unique keys; top(t) returns the
+    value of the smallest-key item with start <= t <= end, or None. Items
+    enter a heap once when they start and leave lazily once t passes their
+    end, so each frame costs O(log n) instead of a scan of every event.
+    """
+
+    def __init__(self, items):
+        self.pending = sorted(items, key=lambda it: it[0])
+        self.next = 0
+        self.heap = []
+
+    def top(self, t):
+        pending, heap = self.pending, self.heap
+        while self.next < len(pending) and pending[self.next][0] <= t:
+            start, end, key, value = pending[self.next]
+            heapq.heappush(heap, (key, end, value))
+            self.next += 1
+        while heap and heap[0][1] < t:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+
+# ───────────────────────  FRAME PLAN  ──────────────────────────
+_BANNER_COLOURS = {
+    "well_state": (0, 255, 0),
+    "pipette_setting": (0, 255, 255),
+    "aspiration": (255, 255, 0),
+    "dispensing": (0, 165, 255),
+    "tip_change": (255, 255, 255),
+}
+
+
+def _frame_ops(evs, top_i, ws_i, tip_idx_act, W, H):
+    """Draw calls, as (fn, args) applied to the frame, for one combination of active events.
+
+    Returns (overlay ops drawn under the plate map, tip-counter ops drawn over it).
+    """
+    ops, tip_ops = [], []
+    top = evs[top_i] if top_i is not None else None
+
+    # ───── BIG WARNING PANEL ─────
+    if top and top["event_type"] == "warning":
+        # ---------- HEADER ----------
+        header_scale = 4.4  # 3.5 × 1.25  →  +25 %
+        header_y = H // 2 - 70
+        ops.append((banner_text, (
+            "WARNING",
+            (W // 2, header_y),
+            header_scale,
+            (0, 0, 255),  # red text
+            6,  # thicker outline
+        )))
+
+        # ---------- DESCRIPTION ----------
+        desc_scale = 1  # 1.2 × 1.25
+        max_width = int(W * 0.7)  # wrap width (70 % of frame)
+        start_x = (W - max_width) // 2
+        start_y = header_y + 80  # a bit below the header
+        desc_txt = _clean(top.get("title", ""))
+
+        ops.append((info_box, (desc_txt, start_x, start_y, max_width, desc_scale)))
+
+    # ───── STANDARD BANNER FOR NON-WARNINGS ─────
+    elif top:
+        em, et = top["event_model"], top["event_model_type"]
+        col = _BANNER_COLOURS.get(top["event_type"], (255, 255, 255))
+        if et == "AspirationEvent":
+            main = f"ASPIRATING {em['reagent']['name'].replace('Reagent ', '')}"
+            det = f"{em['reagent']['volume_ul']}uL"
+        elif et == "DispensingEvent":
+            main = f"DISPENSING {em['reagent']['name'].replace('Reagent ', '')}"
+            det = f"{em['reagent']['volume_ul']}uL"
+        elif et == "WellStateEvent":
+            wid = em["well_id"]
+            st = "COMPLETE" if em["is_complete"] else "PARTIAL"
+            main = f"WELL {wid} {st}"
+            det = "Contains: " + " + ".join(
+                r["name"].replace("Reagent ", "") for r in em["current_contents"]
+            )
+        elif et == "PipetteSettingChange":
+            main = "PIPETTE SET"
+            det = f"{em['new_setting_ul']}uL"
+        else:
+            main = top["title"]
+            det = ""
+        ops.append((banner_text, (main, (W // 2, int(0.08 * H)), BANNER_MAIN_SCALE, col, 3)))
+        if det:
+            ops.append((banner_text, (
+                det,
+                (W // 2, int(0.16 * H)),
+                BANNER_DET_SCALE,
+                (255, 255, 255),
+                2,
+            )))
+        if "thinking" in em:
+            ops.append((info_box, (em["thinking"], 30, 300, 400, 0.9)))
+
+    # WELL-STATE POPUP
+    if ws_i is not None:
+        em = evs[ws_i]["event_model"]
+        wid = em["well_id"]
+        cont = (
+            ", ".join(r["name"].replace("Reagent ", "") for r in em["current_contents"])
+            or "—"
+        )
+        miss = (
+            ", ".join(r["name"].replace("Reagent ", "") for r in em["missing_reagents"])
+            or "—"
+        )
+        ops.append((banner_text, (
+            f"Well {wid} | Contains: {cont} | Missing: {miss}",
+            (W // 2, int(0.92 * H)),
+            POPUP_FONT_SCALE,
+            (255, 255, 255),
+            2,
+        )))
+
+    # TIP COUNTER (every other tip-change)
+    if tip_idx_act is not None and tip_idx_act % 2 == 0:
+        tips_used = tip_idx_act // 2 + 1
+        txt = f"TIPS USED: {tips_used}"
+        tw, th = _ts(txt, TIP_FONT_SCALE, 2)[0]
+        rx1, ry1 = W - 20 - tw - 20, int(0.84 * H)
+        rx2, ry2 = W - 20, ry1 + th + 20
+        tip_ops.append((_rect, ((rx1, ry1), (rx2, ry2), (0, 0, 0), TIP_PANEL_ALPHA)))
+        tip_ops.append((cv2.putText, (
+            txt,
+            (rx1 + 10, ry1 + th + 5),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            TIP_FONT_SCALE,
+            (255, 255, 255),
+            2,
+            cv2.LINE_AA,
+        )))
+
+    return ops, tip_ops
+
+
+# ───────────────────────  WRITER THREAD  ───────────────────────
+def _nvenc_works(fps, size):
+    """Encode one blank frame with NVENC into a scratch file.
+
+    ffmpegcv only launches ffmpeg on the first write, so a missing GPU or
+    encoder does not show up until then; probing here keeps that failure
+    out of the writer thread.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        probe_path = os.path.join(tmp, "probe.mp4")
+        try:
+            probe = ffmpegcv.VideoWriterNV(probe_path, "h264", fps)
+            probe.write(np.zeros((size[1], size[0], 3), np.uint8))
+            probe.release()
+        except Exception as e:
+            print("NVENC unavailable, encoding on CPU:", e)
+            return False
+        if not os.path.exists(probe_path) or os.path.getsize(probe_path) == 0:
+            print("NVENC unavailable, encoding on CPU: probe produced no output")
+            return False
+    return True
+
+
+def _open_writer(output_video, fps, size):
+    """GPU (NVENC) H.264 writer when ffmpegcv and an NVIDIA device are available, else OpenCV's."""
+    if ffmpegcv is not None and _nvenc_works(fps, size):
+        return ffmpegcv.VideoWriterNV(output_video, "h264", fps)
+    return cv2.VideoWriter(output_video, cv2.VideoWriter_fourcc(*"avc1"), fps, size)
+
+
+def _write_frames(out, frames, free, errors):
+    """Encode queued frames until a None sentinel, handing each buffer back for reuse.
+
+    A failed write is recorded in errors; the queue is still drained so the
+    drawing loop never blocks on a full queue.
+    """
+    while True:
+        img = frames.get()
+        if img is None:
+            break
+        if errors:
+            continue
+        try:
+            out.write(img)
+        except Exception as e:
+            errors.append(e)
+        free.put(img)
+
+
 # ───────────────────────  MAIN  ────────────────────────────────
 def create_hud_video_opencv(input_video, timeline_json, output_video):
     data = json.load(open(timeline_json))
@@ -174,34 +471,63 @@ def create_hud_video_opencv(input_video, timeline_json, output_video):
         key=lambda e: e["start_time"],
     )
 
+    # each dispense lands in the well of the first well-state event at/after it
+    well_states = sorted(
+        [e for e in evs if e["event_model_type"] == "WellStateEvent"],
+        key=lambda e: e["start_time"],
+    )
+    ws_starts = [w["start_time"] for w in well_states]
+    disp_well = []
+    for d in disp:
+        j = bisect_left(ws_starts, d["start_time"])
+        disp_well.append(well_states[j] if j < len(well_states) else None)
+
+    # active-interval sweeps; ties break on timeline order, as the scans did
+    top_sweep = ActiveSweep(
+        (e["start_time"], e["end_time"] + 2, (-EVENT_PRIORITY.get(e["event_type"], 0), i), i)
+        for i, e in enumerate(evs)
+    )
+    ws_sweep = ActiveSweep(
+        (e["start_time"], e["end_time"], i, i)
+        for i, e in enumerate(evs)
+        if e["event_model_type"] == "WellStateEvent"
+    )
+    tip_sweep = ActiveSweep(
+        (tp["start_time"], tp["end_time"] + 1, idx, idx)
+        for idx, tp in enumerate(tip_events)
+    )
+
     cap = cv2.VideoCapture(input_video)
     fps, W, H = (
         cap.get(cv2.CAP_PROP_FPS),
         int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
         int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
     )
-    out = cv2.VideoWriter(output_video, cv2.VideoWriter_fourcc(*"avc1"), fps, (W, H))
+    out = _open_writer(output_video, fps, (W, H))
+
+    # encode on a background thread; frame buffers cycle back through `free`,
+    # so at most WRITE_QUEUE_SIZE + 2 are ever allocated
+    frames, free = queue.Queue(maxsize=WRITE_QUEUE_SIZE), queue.Queue()
+    errors = []  # raised by the writer thread, re-raised once it is joined
+    writer = threading.Thread(target=_write_frames, args=(out, frames, free, errors), daemon=True)
+    writer.start()
 
+    plans = {}  # (top, well-state, tip index) -> draw ops
     frame = 0
     while cap.isOpened():
-        ok, img = cap.read()
-        if not ok:
+        try:
+            img = free.get_nowait()  # decode in place into a written buffer
+        except queue.Empty:
+            img = None
+        ok, img = cap.read(img)
+        if not ok or errors:
             break
         t = frame / fps
 
         # update plate state for dispenses
         while di < len(disp) and disp[di]["start_time"] <= t:
             d = disp[di]
-            nxt = min(
-                (
-                    w
-                    for w in evs
-                    if w["event_model_type"] == "WellStateEvent"
-                    and w["start_time"] >= d["start_time"]
-                ),
-                key=lambda w: w["start_time"],
-                default=None,
-            )
+            nxt = disp_well[di]
             if nxt:
                 plate.dispense(
                     nxt["event_model"]["well_id"],
@@ -210,146 +536,32 @@ def create_hud_video_opencv(input_video, timeline_json, output_video):
                 )
             di += 1
 
-        # HIGH-PRIORITY EVENT PICK
-        active = [e for e in evs if e["start_time"] <= t <= e["end_time"] + 2]
-        active.sort(key=lambda e: -EVENT_PRIORITY.get(e["event_type"], 0))
-        top = active[0] if active else None
-
-        # ───── BIG WARNING PANEL ─────
-        if top and top["event_type"] == "warning":
-            # ---------- HEADER ----------
-            header_scale = 4.4  # 3.5 × 1.25  →  +25 %
-            header_y = H // 2 - 70
-            banner_text(
-                img,
-                "WARNING",
-                (W // 2, header_y),
-                header_scale,
-                (0, 0, 255),  # red text
-                6,  # thicker outline
-            )
-
-            # ---------- DESCRIPTION ----------
-            desc_scale = 1  # 1.2 × 1.25
-            max_width = int(W * 0.7)  # wrap width (70 % of frame)
-            start_x = (W - max_width) // 2
-            start_y = header_y + 80  # a bit below the header
-            desc_txt = _clean(top.get("title", ""))
-
-            info_box(img, desc_txt, start_x, start_y, max_width, desc_scale)
-
-        # ───── STANDARD BANNER FOR NON-WARNINGS ─────
-        elif top:
-            em, et = top["event_model"], top["event_model_type"]
-            col = {
-                "well_state": (0, 255, 0),
-                "pipette_setting": (0, 255, 255),
-                "aspiration": (255, 255, 0),
-                "dispensing": (0, 165, 255),
-                "tip_change": (255, 255, 255),
-            }.get(top["event_type"], (255, 255, 255))
-            if et == "AspirationEvent":
-                main = f"ASPIRATING {em['reagent']['name'].replace('Reagent ', '')}"
-                det = f"{em['reagent']['volume_ul']}uL"
-            elif et == "DispensingEvent":
-                main = f"DISPENSING {em['reagent']['name'].replace('Reagent ', '')}"
-                det = f"{em['reagent']['volume_ul']}uL"
-            elif et == "WellStateEvent":
-                wid = em["well_id"]
-                st = "COMPLETE" if em["is_complete"] else "PARTIAL"
-                main = f"WELL {wid} {st}"
-                det = "Contains: " + " + ".join(
-                    r["name"].replace("Reagent ", "") for r in em["current_contents"]
-                )
-            elif et == "PipetteSettingChange":
-                main = "PIPETTE SET"
-                det = f"{em['new_setting_ul']}uL"
-            else:
-                main = top["title"]
-                det = ""
-            banner_text(img, main, (W // 2, int(0.08 * H)), BANNER_MAIN_SCALE, col, 3)
-            if det:
-                banner_text(
-                    img,
-                    det,
-                    (W // 2, int(0.16 * H)),
-                    BANNER_DET_SCALE,
-                    (255, 255, 255),
-                    2,
-                )
-            if "thinking" in em:
-                info_box(img, em["thinking"], 30, 300, 400, 0.9)
-
-        # WELL-STATE POPUP
-        ws = next(
-            (
-                w
-                for w in evs
-                if w["event_model_type"] == "WellStateEvent"
-                and w["start_time"] <= t <= w["end_time"]
-            ),
-            None,
-        )
-        if ws:
-            em = ws["event_model"]
-            wid = em["well_id"]
-            cont = (
-                ", ".join(
-                    r["name"].replace("Reagent ", "") for r in em["current_contents"]
-                )
-                or "—"
-            )
-            miss = (
-                ", ".join(
-                    r["name"].replace("Reagent ", "") for r in em["missing_reagents"]
-                )
-                or "—"
-            )
-            banner_text(
-                img,
-                f"Well {wid} | Contains: {cont} | Missing: {miss}",
-                (W // 2, int(0.92 * H)),
-                POPUP_FONT_SCALE,
-                (255, 255, 255),
-                2,
-            )
+        # HUD layout is a pure function of the active events; build it once per combination
+        key = (top_sweep.top(t), ws_sweep.top(t), tip_sweep.top(t))
+        ops = plans.get(key)
+        if ops is None:
+            ops = plans[key] = _frame_ops(evs, *key, W, H)
+        overlay_ops, tip_ops = ops
+        for fn, args in overlay_ops:
+            fn(img, *args)
 
         # PLATE MAP
         if t >= 3:
             plate.draw(img, W - PLATE_W - PLATE_MARGIN, PLATE_MARGIN, PLATE_W, PLATE_H)
 
-        # TIP COUNTER (every other tip-change)
-        tip_idx_act = None
-        for idx, tp in enumerate(tip_events):
-            if tp["start_time"] <= t <= tp["end_time"] + 1:
-                tip_idx_act = idx
-                break
-        if tip_idx_act is not None and tip_idx_act % 2 == 0:
-            tips_used = tip_idx_act // 2 + 1
-            txt = f"TIPS USED: {tips_used}"
-            tw, th = cv2.getTextSize(txt, cv2.FONT_HERSHEY_SIMPLEX, TIP_FONT_SCALE, 2)[
-                0
-            ]
-            rx1, ry1 = W - 20 - tw - 20, int(0.84 * H)
-            rx2, ry2 = W - 20, ry1 + th + 20
-            _rect(img, (rx1, ry1), (rx2, ry2), (0, 0, 0), TIP_PANEL_ALPHA)
-            cv2.putText(
-                img,
-                txt,
-                (rx1 + 10, ry1 + th + 5),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                TIP_FONT_SCALE,
-                (255, 255, 255),
-                2,
-                cv2.LINE_AA,
-            )
+        for fn, args in tip_ops:
+            fn(img, *args)
 
-        out.write(img)
+        frames.put(img)
         frame += 1
 
+    frames.put(None)
+    writer.join()
     cap.release()
     out.release()
     cv2.destroyAllWindows()
+    if errors:
+        raise errors[0]
     print("✓ HUD video written:", output_video)
 
 
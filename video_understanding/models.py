@@ -1,8 +1,11 @@
+import weakref
 from datetime import datetime
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+from pydantic.json_schema import SkipJsonSchema
 
 
 # Enums for better type safety
@@ -31,11 +34,42 @@ class WarningType(str, Enum):
     PROTOCOL_DEVIATION = "protocol_deviation"
 
 
+# Members compare by rank while keeping their string values; plain strings
+# are converted first, so WarningSeverity.HIGH >= "low" compares by rank too.
+# (No docstring: it would become the enum's description in the LLM response schema.)
 class WarningSeverity(str, Enum):
-    LOW = "low"
-    MEDIUM = "medium"
-    HIGH = "high"
-    CRITICAL = "critical"
+    LOW = ("low", 1)
+    MEDIUM = ("medium", 2)
+    HIGH = ("high", 3)
+    CRITICAL = ("critical", 4)
+
+    def __new__(cls, value: str, rank: int):
+        member = str.__new__(cls, value)
+        member._value_ = value
+        member.rank = rank
+        return member
+
+    @classmethod
+    def _rank_of(cls, other):
+        if isinstance(other, str):
+            return cls(other).rank
+        return NotImplemented
+
+    def __lt__(self, other):
+        rank = self._rank_of(other)
+        return rank if rank is NotImplemented else self.rank < rank
+
+    def __le__(self, other):
+        rank = self._rank_of(other)
+        return rank if rank is NotImplemented else self.rank <= rank
+
+    def __gt__(self, other):
+        rank = self._rank_of(other)
+        return rank if rank is NotImplemented else self.rank > rank
+
+    def __ge__(self, other):
+        rank = self._rank_of(other)
+        return rank if rank is NotImplemented else self.rank >= rank
 
 
 # Core data models
@@ -349,6 +383,108 @@ class WellContents(BaseModel):
         )  # 0.5µl tolerance
 
 
+class TransferStore:
+    """Column-oriented (SoA) mirror of ExperimentState.all_transfers for aggregate queries"""
+
+    _BLOCK_ROWS = 1024
+    _CONTAMINATION_LEVELS = tuple(ContaminationLevel)
+
+    def __init__(self):
+        self._size = 0
+        self.reagent_names: List[str] = []
+        self.well_ids: List[str] = []
+        self._reagent_index: Dict[str, int] = {}
+        self._well_index: Dict[str, int] = {}
+
+        self._timestamp = np.empty(0, dtype="datetime64[ms]")
+        self._reagent_id = np.empty(0, dtype=np.int32)
+        self._dest_well_id = np.empty(0, dtype=np.int32)
+        self._intended_volume_ul = np.empty(0, dtype=np.float64)
+        self._volume_ul = np.empty(0, dtype=np.float64)
+        self._tip_contam_before = np.empty(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _intern(self, index: Dict[str, int], names: List[str], name: str) -> int:
+        code = index.get(name)
+        if code is None:
+            code = index[name] = len(names)
+            names.append(name)
+        return code
+
+    def _grow(self):
+        capacity = len(self._volume_ul) + self._BLOCK_ROWS
+        for column in (
+            "_timestamp",
+            "_reagent_id",
+            "_dest_well_id",
+            "_intended_volume_ul",
+            "_volume_ul",
+            "_tip_contam_before",
+        ):
+            old = getattr(self, column)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[: self._size] = old[: self._size]
+            setattr(self, column, new)
+
+    def append(self, transfer: "ReagentTransfer"):
+        """Append one transfer as a row across all columns"""
+        if self._size == len(self._volume_ul):
+            self._grow()
+
+        row = self._size
+        self._timestamp[row] = np.datetime64(transfer.timestamp, "ms")
+        self._reagent_id[row] = self._intern(
+            self._reagent_index, self.reagent_names, transfer.reagent.name
+        )
+        self._dest_well_id[row] = self._intern(
+            self._well_index, self.well_ids, transfer.destination_well
+        )
+        self._intended_volume_ul[row] = transfer.intended_volume_ul
+        # Same volume WellContents.add_reagent credits to the well
+        self._volume_ul[row] = transfer.actual_volume_ul or transfer.intended_volume_ul
+        self._tip_contam_before[row] = self._CONTAMINATION_LEVELS.index(
+            transfer.tip_contamination_before
+        )
+        self._size += 1
+
+    @property
+    def timestamp(self) -> np.ndarray:
+        return self._timestamp[: self._size]
+
+    @property
+    def reagent_id(self) -> np.ndarray:
+        return self._reagent_id[: self._size]
+
+    @property
+    def dest_well_id(self) -> np.ndarray:
+        return self._dest_well_id[: self._size]
+
+    @property
+    def intended_volume_ul(self) -> np.ndarray:
+        return self._intended_volume_ul[: self._size]
+
+    @property
+    def volume_ul(self) -> np.ndarray:
+        return self._volume_ul[: self._size]
+
+    @property
+    def tip_contam_before(self) -> np.ndarray:
+        return self._tip_contam_before[: self._size]
+
+    def total_volume_ul(self) -> float:
+        """Total volume moved across all transfers"""
+        return float(self.volume_ul.sum())
+
+    def volume_by_reagent(self) -> Dict[str, float]:
+        """Total volume moved per reagent name"""
+        totals = np.bincount(
+            self.reagent_id, weights=self.volume_ul, minlength=len(self.reagent_names)
+        )
+        return dict(zip(self.reagent_names, totals.tolist()))
+
+
 class ExperimentState(BaseModel):
     """Complete experiment state for HUD overlay and analysis"""
 
@@ -357,7 +493,7 @@ class ExperimentState(BaseModel):
     last_updated: datetime = Field(default_factory=datetime.now)
 
     # Equipment state
-    pipette_state: Optional[PipetteState] = Field(default=None)
+    pipette_state: PipetteState = Field(default_factory=PipetteState)
 
     # Container states
     wells: Dict[str, WellContents] = Field(
@@ -377,7 +513,12 @@ class ExperimentState(BaseModel):
     )
 
     # Event tracking
-    all_transfers: List[ReagentTransfer] = Field(default_factory=list)
+    # Stored, append-only list: add_transfer appends here, so readers get the
+    # list itself rather than a view rebuilt from the wells
+    all_transfers: List[ReagentTransfer] = Field(
+        default_factory=list,
+        description="Every transfer in the order it was recorded",
+    )
     contamination_warnings: List[ContaminationWarning] = Field(default_factory=list)
     volume_discrepancies: List[VolumeDiscrepancy] = Field(default_factory=list)
 
@@ -397,9 +538,58 @@ class ExperimentState(BaseModel):
     )
     critical_warnings: int = Field(default=0, description="Number of critical warnings")
 
+    # Change tracking
+    version: int = Field(
+        default=0, description="Incremented on every recorded state change"
+    )
+
+    _transfer_store: TransferStore = PrivateAttr(default_factory=TransferStore)
+    # The list the store mirrors and the last transfer it has, to spot a
+    # replaced list or rows removed/replaced instead of appended
+    _transfer_store_source: Optional[List[ReagentTransfer]] = PrivateAttr(default=None)
+    _transfer_store_last: Optional[ReagentTransfer] = PrivateAttr(default=None)
+
+    def __copy__(self):
+        # model_copy shares private attributes; give the copy its own store,
+        # rebuilt from its own all_transfers on first use
+        copied = super().__copy__()
+        copied._transfer_store = TransferStore()
+        copied._transfer_store_source = None
+        copied._transfer_store_last = None
+        return copied
+
+    @property
+    def transfer_store(self) -> TransferStore:
+        """Columnar view of all_transfers, caught up with any rows appended directly
+
+        Appends are mirrored incrementally. If all_transfers was replaced, got
+        shorter, or its last mirrored row is no longer the same object, the
+        store is rebuilt from scratch.
+        """
+        store = self._transfer_store
+        transfers = self.all_transfers
+        synced = len(store)
+        if (
+            self._transfer_store_source is not transfers
+            or synced > len(transfers)
+            or (synced and transfers[synced - 1] is not self._transfer_store_last)
+        ):
+            store = self._transfer_store = TransferStore()
+            self._transfer_store_source = transfers
+            synced = 0
+        for transfer in transfers[synced:]:
+            store.append(transfer)
+        self._transfer_store_last = transfers[-1] if transfers else None
+        return store
+
+    def total_volume_transferred_ul(self) -> float:
+        """Total volume moved by all transfers in the experiment"""
+        return self.transfer_store.total_volume_ul()
+
     def add_transfer(self, transfer: ReagentTransfer):
         """Add a new reagent transfer to the experiment"""
         self.all_transfers.append(transfer)
+        self.version += 1
 
         # Update destination well
         if transfer.destination_well not in self.wells:
@@ -420,6 +610,7 @@ class ExperimentState(BaseModel):
     def add_contamination_warning(self, warning: ContaminationWarning):
         """Add a contamination warning"""
         self.contamination_warnings.append(warning)
+        self.version += 1
         if warning.is_critical():
             self.critical_warnings += 1
 
@@ -435,6 +626,7 @@ class ExperimentState(BaseModel):
     def add_volume_discrepancy(self, discrepancy: VolumeDiscrepancy):
         """Add a volume discrepancy"""
         self.volume_discrepancies.append(discrepancy)
+        self.version += 1
 
     def update_completion_metrics(self):
         """Update experiment completion metrics"""
@@ -456,35 +648,36 @@ class ExperimentState(BaseModel):
 
     def get_hud_summary(self) -> Dict[str, Any]:
         """Get summary information for HUD overlay"""
-        if self.pipette_state:
-            pipette_volume = f"{self.pipette_state.volume_setting_ul}µl"
-            pipette_reagent = (
-                self.pipette_state.last_reagent_aspirated.name
-                if self.pipette_state.last_reagent_aspirated
-                else "None"
-            )
-            tip_status = self.pipette_state.tip_contamination_level.value
-            last_action = self.pipette_state.last_action.value
-        else:
-            pipette_volume = "N/A"
-            pipette_reagent = "None"
-            tip_status = "unknown"
-            last_action = "idle"
+        pipette_reagent = (
+            self.pipette_state.last_reagent_aspirated.name
+            if self.pipette_state.last_reagent_aspirated
+            else "None"
+        )
 
         return {
             "experiment_id": self.experiment_id,
             "completion_percentage": self.completion_percentage,
             "wells_completed": f"{self.wells_completed}/{self.total_wells}",
-            "pipette_volume": pipette_volume,
+            "pipette_volume": f"{self.pipette_state.volume_setting_ul}µl",
             "pipette_reagent": pipette_reagent,
-            "tip_status": tip_status,
+            "tip_status": self.pipette_state.tip_contamination_level.value,
             "active_warnings": len(self.get_active_warnings()),
             "contamination_risk": self.contamination_risk_level.value,
-            "last_action": last_action,
+            "last_action": self.pipette_state.last_action.value,
             "total_transfers": len(self.all_transfers),
         }
 
 
+# Live experiment states by experiment_id. Analyses carry only the id and
+# version, so the full state is looked up here instead of being embedded.
+# Entries are weak: every VideoAnalysis that references a state also holds
+# it, so a state stays resolvable while its analyzer or any of its analyses
+# is alive, and leaves the registry after that.
+EXPERIMENT_REGISTRY: "weakref.WeakValueDictionary[str, ExperimentState]" = (
+    weakref.WeakValueDictionary()
+)
+
+
 # Legacy models for backward compatibility
 class Well(BaseModel):
     """Simple well model for backward compatibility"""
@@ -498,6 +691,10 @@ class Well(BaseModel):
 class VideoAnalysis(BaseModel):
     """Enhanced video analysis with new tracking capabilities"""
 
+    # Enhanced fields are filled in bulk via model_copy(update=...); keep plain
+    # attribute assignment unvalidated
+    model_config = ConfigDict(validate_assignment=False)
+
     thinking: str = Field(
         ...,
         description="Your reasoning about what you observed happening in this frame sequence. Explain what pipetting operations occurred and how they relate to the procedure.",
@@ -517,8 +714,13 @@ class VideoAnalysis(BaseModel):
     experiment_state_updated: bool = Field(
         default=False, description="Whether the complete experiment state was updated"
     )
-    experiment_state: Optional[ExperimentState] = Field(
-        None, description="Complete experiment state with enhanced tracking"
+    # Bookkeeping set by the analyzer, not by the model: kept out of the
+    # JSON schema sent as response_schema
+    experiment_id: SkipJsonSchema[Optional[str]] = Field(
+        None, description="Experiment this analysis belongs to (key into EXPERIMENT_REGISTRY)"
+    )
+    experiment_state_version: SkipJsonSchema[Optional[int]] = Field(
+        None, description="ExperimentState.version after this analysis was applied"
     )
 
     # Specific event detection
@@ -554,3 +756,27 @@ class VideoAnalysis(BaseModel):
     key_events_detected: List[str] = Field(
         default_factory=list, description="Key events detected in this frame sequence"
     )
+
+    # Strong reference to the referenced state, keeping its registry entry alive
+    _experiment_state: Optional[ExperimentState] = PrivateAttr(default=None)
+
+    def attach_experiment_state(self, state: ExperimentState) -> None:
+        """Reference state by id and current version, and keep it resolvable"""
+        self.experiment_id = state.experiment_id
+        self.experiment_state_version = state.version
+        self._experiment_state = state
+
+    def get_experiment_state(self) -> Optional[ExperimentState]:
+        """The referenced experiment state (current, not as of experiment_state_version)"""
+        if self._experiment_state is not None:
+            return self._experiment_state
+        if self.experiment_id is None:
+            return None
+        return EXPERIMENT_REGISTRY.get(self.experiment_id)
+
+    def model_dump_with_state(self, **kwargs) -> Dict[str, Any]:
+        """model_dump plus the full referenced state under "experiment_state" (opt-in)"""
+        data = self.model_dump(**kwargs)
+        state = self.get_experiment_state()
+        data["experiment_state"] = state.model_dump(**kwargs) if state is not None else None
+        return data
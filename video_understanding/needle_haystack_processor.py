@@ -3,6 +3,7 @@ Needle-in-haystack video processor for lab procedure analysis.
 Processes entire videos with targeted queries to avoid error propagation.
 """
 
+from collections.abc import Mapping
 from typing import List, Dict, Any
 from dataclasses import dataclass
 from datetime import datetime
@@ -219,7 +220,7 @@ class NeedleHaystackProcessor:
         results = self._query_video_model(query)
 
         # Store protocol context for state building
-        self.protocol_context = results if isinstance(results, dict) else {}
+        self.protocol_context = results if isinstance(results, Mapping) else {}
 
     def _build_experiment_state(self) -> ExperimentState:
         """
@@ -466,17 +467,12 @@ def process_lab_video_full_context(video_path: str) -> ExperimentState:
 def generate_hud_data(experiment_state: ExperimentState) -> Dict[str, Any]:
     """Generate data structure for real-time HUD overlay"""
 
-    if experiment_state.pipette_state:
-        pipette_volume = f"{experiment_state.pipette_state.volume_setting_ul}µl"
-        pipette_reagent = (experiment_state.pipette_state.last_reagent_aspirated.name
-                          if experiment_state.pipette_state.last_reagent_aspirated else "None")
-        tip_status = experiment_state.pipette_state.tip_contamination_level.value
-        aspiration_volume = f"{experiment_state.pipette_state.actual_aspirated_volume_ul or 0}µl"
-    else:
-        pipette_volume = "N/A"
-        pipette_reagent = "None"
-        tip_status = "unknown"
-        aspiration_volume = "0µl"
+    pipette = experiment_state.pipette_state
+    pipette_volume = f"{pipette.volume_setting_ul}µl"
+    pipette_reagent = (pipette.last_reagent_aspirated.name
+                      if pipette.last_reagent_aspirated else "None")
+    tip_status = pipette.tip_contamination_level.value
+    aspiration_volume = f"{pipette.actual_aspirated_volume_ul or 0}µl"
 
     return {
         "pipette": {
@@ -1,7 +1,8 @@
+import re
 from datetime import datetime
-from typing import List, Optional, Union
+from typing import Annotated, Any, List, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Discriminator, Field, Tag
 
 
 class Reagent(BaseModel):
@@ -113,6 +114,66 @@ class WellStateEvent(BaseModel):
     )
 
 
+def objective_event_kind(data: Any) -> Optional[str]:
+    """Tag raw objective event data by the keys it carries"""
+    if not isinstance(data, dict):
+        return _OBJECTIVE_EVENT_TAGS.get(type(data))
+    if "new_setting_ul" in data:
+        return "pipette_setting"
+    if "reagent" in data:
+        # Aspiration and dispensing share a shape; the reasoning tells them apart
+        if _ASPIRATE_RE.search(data.get("thinking", "")):
+            return "aspiration"
+        return "dispensing"
+    return "tip_change"
+
+
+def analysis_event_kind(data: Any) -> Optional[str]:
+    """Tag raw analysis event data by the keys it carries (None if neither kind)"""
+    if not isinstance(data, dict):
+        return _ANALYSIS_EVENT_TAGS.get(type(data))
+    if "warning_message" in data:
+        return "warning"
+    if "well_id" in data:
+        return "well_state"
+    return None
+
+
+# "aspiration" or "aspirate" in any case, without lower-casing the reasoning text
+_ASPIRATE_RE = re.compile(r"aspirat(?:ion|e)", re.IGNORECASE)
+
+_OBJECTIVE_EVENT_TAGS = {
+    PipetteSettingChange: "pipette_setting",
+    AspirationEvent: "aspiration",
+    DispensingEvent: "dispensing",
+    TipChangeEvent: "tip_change",
+}
+
+_ANALYSIS_EVENT_TAGS = {
+    WarningEvent: "warning",
+    WellStateEvent: "well_state",
+}
+
+# Discriminated unions for validating raw event lists in one call (e.g. with a TypeAdapter)
+ObjectiveEvent = Annotated[
+    Union[
+        Annotated[PipetteSettingChange, Tag("pipette_setting")],
+        Annotated[AspirationEvent, Tag("aspiration")],
+        Annotated[DispensingEvent, Tag("dispensing")],
+        Annotated[TipChangeEvent, Tag("tip_change")],
+    ],
+    Discriminator(objective_event_kind),
+]
+
+AnalysisEvent = Annotated[
+    Union[
+        Annotated[WarningEvent, Tag("warning")],
+        Annotated[WellStateEvent, Tag("well_state")],
+    ],
+    Discriminator(analysis_event_kind),
+]
+
+
 class ObjectiveEventsList(BaseModel):
     """Wrapper for list of objective events"""
 
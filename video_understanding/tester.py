@@ -1,5 +1,6 @@
 import glob
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional
 
@@ -58,12 +59,16 @@ class StatefulTester:
         # Load previous state if starting from a specific batch
         self._load_cached_state(start_batch)
 
-    def get_current_batch_files(self) -> List[str]:
-        """Get the current batch of image file paths"""
-        start_idx = self.current_batch * self.batch_size
+    def get_batch_files(self, batch_num: int) -> List[str]:
+        """Get the image file paths for a given batch (empty past the end)"""
+        start_idx = batch_num * self.batch_size
         end_idx = start_idx + self.batch_size
         return self.image_files[start_idx:end_idx]
 
+    def get_current_batch_files(self) -> List[str]:
+        """Get the current batch of image file paths"""
+        return self.get_batch_files(self.current_batch)
+
     def has_next_batch(self) -> bool:
         """Check if there are more batches to process"""
         return (self.current_batch * self.batch_size) < len(self.image_files)
@@ -108,8 +113,14 @@ class StatefulTester:
             self.persistent_protocol_log = cached_state["persistent_protocol_log"]
             self.persistent_warnings = cached_state["persistent_warnings"]
 
-    def process_current_batch(self) -> Optional[VideoAnalysis]:
-        """Process the current batch and update state"""
+    def process_current_batch(
+        self, image_parts: Optional[List[types.Part]] = None
+    ) -> Optional[VideoAnalysis]:
+        """Process the current batch and update state
+
+        image_parts may be passed in when the batch's blobs were already
+        read (see process_all_batches); otherwise they are created here.
+        """
         if not self.has_next_batch():
             print("No more batches to process!")
             return None
@@ -122,11 +133,14 @@ class StatefulTester:
 
         import time
 
-        start_time = time.perf_counter()
-        # Create inline blobs
-        image_parts = self.create_batch_blobs(batch_files)
-        end_time = time.perf_counter()
-        print(f"Time taken to create image blobs: {end_time - start_time} seconds")
+        if image_parts is None:
+            start_time = time.perf_counter()
+            # Create inline blobs
+            image_parts = self.create_batch_blobs(batch_files)
+            end_time = time.perf_counter()
+            print(f"Time taken to create image blobs: {end_time - start_time} seconds")
+        else:
+            print("Using prefetched image blobs")
 
         if len(image_parts) != self.batch_size:
             print(f"Warning: Expected {self.batch_size} files, got {len(image_parts)}")
@@ -299,13 +313,27 @@ class StatefulTester:
         print(f"⚠️  WARNINGS: {self.persistent_warnings or 'None'}")
 
 
-def process_all_batches(tester: StatefulTester) -> None:
-    """Process all remaining batches and show final state"""
+def process_all_batches(tester: StatefulTester, prefetch: bool = True) -> None:
+    """Process all remaining batches and show final state
+
+    Each batch's prompt depends on the state left by the one before, so
+    batches run in order. With prefetch, the next batch's images are read
+    in the background while the current batch is at the model.
+    """
     batch_count = 0
-    while tester.has_next_batch():
-        result = tester.process_current_batch()
-        batch_count += 1
-        print(f"Processed batch {batch_count}")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = None
+        while tester.has_next_batch():
+            image_parts = pending.result() if pending is not None else None
+            pending = None
+            if prefetch:
+                next_files = tester.get_batch_files(tester.current_batch + 1)
+                if next_files:
+                    pending = executor.submit(tester.create_batch_blobs, next_files)
+
+            result = tester.process_current_batch(image_parts)
+            batch_count += 1
+            print(f"Processed batch {batch_count}")
 
     print(f"\n🎉 Processed {batch_count} total batches!")
     print("\n=== FINAL STATE ===")